@@ -2,18 +2,28 @@ import csv
 import io
 import os
 import time
-from fastapi import APIRouter, HTTPException, Cookie, Depends, Query, Path, BackgroundTasks, Response
+from fastapi import APIRouter, HTTPException, Cookie, Depends, Query, Path, BackgroundTasks, Request, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from dataclasses import asdict
 from kyc_db.database import db
 from models import KycInitiateRequestDTO, KycInitiateResponseDTO, KycDashboardRequestDTO, KycDashboardResponseDTO, KycDashboardDetailsResponseDTO, KycDetailsDataDTO, AdminDashboardResponseDTO, KycMainDashboardDataDTO, BaseResponse
-from kyc_email_sender import EmailManager
-from typing import Optional
+from kyc_email_sender import EmailManager, get_mail_dispatcher
+from typing import List, Optional
 from kyc_db import KYC
-from services.admin.manager import add_kyc_status_entry, add_kyc_entry, get_dashboard_data, get_kyc_details, get_main_dashboard_data, approve_kyc, reject_kyc, initiate_rekyc
+from services.admin.summary_cache import record_kyc_initiated
+from services.admin.manager import add_kyc_status_entry, add_kyc_entry, bulk_initiate_kyc, get_dashboard_data, build_dashboard_conditions, iter_dashboard_export_rows, get_kyc_details, get_main_dashboard_data, approve_kyc, reject_kyc, initiate_rekyc
+from services.user.images import hydrate_kyc_images
+from services.user.user_db import get_kyc_version
+from controllers.http_cache import make_etag, not_modified, PRIVATE_REVALIDATE
+from services.jobs import get_job
+from services.compute import get_compute_pool, parse_customer_rows, ComputePoolBusyError
 from kyc_auth import verify_access_token
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
+MAX_BULK_INITIATE_SIZE = int(os.getenv("MAX_BULK_INITIATE_SIZE", "50000"))
+
 
 @router.get("/kyc/dashboard-data", response_model=KycDashboardResponseDTO)
 def dashboard( 
@@ -21,6 +31,7 @@ def dashboard(
     status: Optional[str] = Query(None, description="Filter by status: approved, pending, under_review, rejected"),
     page: int = Query(0, description="Page number for pagination"),
     size: int = Query(10, description="Number of records per page"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor for keyset pagination; send it empty to fetch the first page"),
     db_session: Session = Depends(db.get_db), access_token: Optional[str] = Cookie(None)):
     try:
         # Validate token in cookies
@@ -50,7 +61,7 @@ def dashboard(
                 search_value = search
         st = time.time()
         # Simulate fetching dashboard data (you can connect to DB or other services here)
-        dashboard_data, total_count = get_dashboard_data(db_session, admin_id=admin_id, search_field=search_field,search_value=search_value,status=status, page=page, size=size)
+        dashboard_data, total_count, next_cursor = get_dashboard_data(db_session, admin_id=admin_id, search_field=search_field,search_value=search_value,status=status, page=page, size=size, cursor=cursor)
         print(f"Time taken for dashboard data extraction {time.time()-st}")
         return KycDashboardResponseDTO(
             success=True,
@@ -59,6 +70,7 @@ def dashboard(
                 "total_records": total_count,
                 "page": page,
                 "page_size": size,
+                "next_cursor": next_cursor,
                 "records": dashboard_data
             } 
         )
@@ -72,7 +84,6 @@ def download_dashboard_csv(
     status: str = None,
     search_field: str = None,
     search_value: str = None,
-    db_session: Session = Depends(db.get_db),
     access_token: Optional[str] = Cookie(None)
 ):
         if not access_token:
@@ -83,58 +94,37 @@ def download_dashboard_csv(
 
         if not admin_id:
             raise HTTPException(status_code=400, detail="Invalid token payload")
-    # ---- Step 1: get total count first ----
-        _, total_count = get_dashboard_data(
-            db_session=db_session,
-            admin_id=admin_id,
-            search_field=search_field,
-            search_value=search_value,
-            status=status,
-            page=0,
-            size=1_000_000_000  
-        )
 
-        # ---- Step 2: fetch ALL rows at once ----
-        records, _ = get_dashboard_data(
-            db_session=db_session,
-            admin_id=admin_id,
-            search_field=search_field,
-            search_value=search_value,
-            status=status,
-            page=0,
-            size=total_count,
+        # Validate filters up front so a bad request fails before streaming starts
+        conditions = build_dashboard_conditions(admin_id, search_field, search_value, status)
+
+        def csv_chunks():
+            # The request-scoped session is closed before the body streams,
+            # so the export owns its session for the lifetime of the response.
+            export_session = db.get_session()
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            try:
+                writer.writerow(["kyc_id", "user_name", "email", "status", "submitted_at"])
+                for rows in iter_dashboard_export_rows(export_session, conditions):
+                    writer.writerows(rows)
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate(0)
+                if buffer.tell():
+                    yield buffer.getvalue()
+            finally:
+                buffer.close()
+                export_session.close()
+
+        return StreamingResponse(
+            csv_chunks(),
+            media_type="text/csv",
+            headers={
+                "Content-Disposition": f"attachment; filename=admin_{admin_id}_dashboard.csv"
+            },
         )
 
-        # ---- Step 3: create CSV in memory ----
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=[
-            "kyc_id", "user_name", "email", "status", "submitted_at"
-        ])
-        writer.writeheader()
-        cleaned_records = []
-        for row in records:
-            cleaned_records.append({
-                "kyc_id": row["kyc_id"],
-                "user_name": row["user_name"],
-                "email": row["email"],
-                "status": row["status"],
-                "submitted_at": row["submitted_at"]
-            })
-
-        writer.writerows(cleaned_records)
-
-        csv_data = output.getvalue()
-        output.close()
-
-        # ---- Step 4: return CSV as download ----
-        return Response(
-        content=csv_data,
-        media_type="text/csv",
-        headers={
-            "Content-Disposition": f"attachment; filename=admin_{admin_id}_dashboard.csv"
-        },
-    )
-
 @router.get("/kyc/dashboard", response_model=AdminDashboardResponseDTO)
 def kyc_dashboard_data(
     db_session: Session = Depends(db.get_db),
@@ -191,7 +181,7 @@ async def initiate_kyc(request_data: KycInitiateRequestDTO,background_tasks: Bac
         # Simulate KYC initiation (you can connect to DB or other services here)
         kyc_id = add_kyc_status_entry(db_session, user_id=user_id, admin_id=admin_id)
         result = {"kyc_id": kyc_id, "status": "Initiated"}
-        add_kyc_entry(
+        kyc_entry = add_kyc_entry(
             db_session,
             kyc_id=kyc_id,
             user_id=user_id,
@@ -201,8 +191,9 @@ async def initiate_kyc(request_data: KycInitiateRequestDTO,background_tasks: Bac
         )
         
         db_session.commit()
+        record_kyc_initiated(admin_id, [{"kyc_id": kyc_id, "name": request_data.name}], kyc_entry.submitted_at)
         
-        email_manager = EmailManager(smtp_server, smtp_port, sender_email, sender_password)
+        email_manager = EmailManager(smtp_server, smtp_port, sender_email, sender_password, dispatcher=get_mail_dispatcher())
         end = time.time()
         print(f"KYC Initiation took {end - start} seconds")
         background_tasks.add_task(
@@ -224,8 +215,116 @@ async def initiate_kyc(request_data: KycInitiateRequestDTO,background_tasks: Bac
         raise HTTPException(status_code=500, detail=f"Server Error: {str(e)}")
 
 
+def _bulk_initiate(customers: List[KycInitiateRequestDTO], background_tasks: BackgroundTasks, db_session: Session, access_token: Optional[str]):
+    if not access_token:
+        raise HTTPException(status_code=401, detail="Missing JWT token in cookies")
+
+    user_data = verify_access_token(access_token)
+    user_id = user_data.get("user_id")
+    admin_id = user_data.get("user_id")
+
+    if not user_id:
+        raise HTTPException(status_code=400, detail="Invalid token payload")
+    if len(customers) > MAX_BULK_INITIATE_SIZE:
+        raise HTTPException(status_code=400, detail=f"A bulk initiation can contain at most {MAX_BULK_INITIATE_SIZE} customers")
+
+    # Invalid rows are reported back instead of failing the whole batch
+    valid, failed = [], []
+    for row, customer in enumerate(customers):
+        try:
+            customer.validate_request()
+            valid.append((row, customer))
+        except Exception as e:
+            failed.append({"row": row, "email": getattr(customer, "email", None), "error": str(e)})
+
+    kyc_ids = bulk_initiate_kyc(db_session, user_id=user_id, admin_id=admin_id, customers=[c for _, c in valid]) if valid else []
+
+    email_manager = EmailManager(
+        os.getenv("SMTP_SERVER"),
+        int(os.getenv("SMTP_PORT")),
+        os.getenv("SMTP_SENDER_EMAIL"),
+        os.getenv("SMTP_SENDER_PASSWORD"),
+        dispatcher=get_mail_dispatcher()
+    )
+    background_tasks.add_task(
+        email_manager.send_bulk_welcome_emails,
+        recipients=[
+            {"recipient_email": customer.email, "user_name": customer.name, "kyc_id": kyc_id}
+            for (_, customer), kyc_id in zip(valid, kyc_ids)
+        ],
+        base_url=os.getenv("INITIATE_URL")
+    )
+    return KycInitiateResponseDTO(
+        success=True,
+        message=f"KYC process initiated for {len(kyc_ids)} customers, {len(failed)} rejected",
+        data={
+            "created": [
+                {"row": row, "kyc_id": kyc_id, "email": customer.email}
+                for (row, customer), kyc_id in zip(valid, kyc_ids)
+            ],
+            "failed": failed
+        }
+    )
+
+
+def _customers_from_rows(rows) -> List[KycInitiateRequestDTO]:
+    return [
+        KycInitiateRequestDTO(name=name, email=email, mobile_number=mobile_number)
+        for name, email, mobile_number in rows
+    ]
+
+
+async def _parse_bulk_upload(content: bytes, fmt: str) -> List[KycInitiateRequestDTO]:
+    # Parsing tens of thousands of rows would stall the event loop, so it runs in the compute pool
+    try:
+        rows = await get_compute_pool().run_async(parse_customer_rows, content, fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _customers_from_rows(rows)
+
+
+@router.post(
+    "/kyc/initiate/bulk",
+    response_model=KycInitiateResponseDTO,
+    openapi_extra={"requestBody": {"required": True, "content": {"application/json": {"schema": {
+        "type": "object",
+        "required": ["customers"],
+        "properties": {"customers": {"type": "array", "items": {
+            "type": "object",
+            "required": ["name", "email", "mobile_number"],
+            "properties": {
+                "name": {"type": "string"},
+                "email": {"type": "string"},
+                "mobile_number": {"type": "string"},
+            },
+        }}},
+    }}}}},
+)
+async def initiate_kyc_bulk(request: Request, background_tasks: BackgroundTasks, db_session: Session = Depends(db.get_db), access_token: Optional[str] = Cookie(None)):
+    try:
+        # Read raw (schema in openapi_extra) so the JSON is parsed off the event loop
+        customers = await _parse_bulk_upload(await request.body(), "json")
+        return await run_in_threadpool(_bulk_initiate, customers, background_tasks, db_session, access_token)
+    except (HTTPException, ComputePoolBusyError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server Error: {str(e)}")
+
+
+@router.post("/kyc/initiate/bulk/csv", response_model=KycInitiateResponseDTO)
+async def initiate_kyc_bulk_csv(background_tasks: BackgroundTasks, file: UploadFile = File(..., description="CSV with name, email and mobile_number columns"), db_session: Session = Depends(db.get_db), access_token: Optional[str] = Cookie(None)):
+    try:
+        customers = await _parse_bulk_upload(await file.read(), "csv")
+        return await run_in_threadpool(_bulk_initiate, customers, background_tasks, db_session, access_token)
+    except (HTTPException, ComputePoolBusyError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server Error: {str(e)}")
+
 @router.get("/kyc/{kyc_id}", response_model=KycDashboardDetailsResponseDTO)
 def kyc_detail(
+    request: Request,
+    response: Response,
      kyc_id: int = Path(..., description="KYC ID to fetch details for"),
     db_session: Session = Depends(db.get_db),
     access_token: Optional[str] = Cookie(None)):
@@ -240,6 +339,16 @@ def kyc_detail(
         if not admin_id:
             raise HTTPException(status_code=400, detail="Invalid token payload")
 
+        # Revalidation only costs the version query; the full row and its images are skipped
+        version = get_kyc_version(kyc_id, db_session)
+        if version:
+            etag = make_etag(version, "admin")
+            cached = not_modified(request, etag)
+            if cached:
+                return cached
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = PRIVATE_REVALIDATE
+
         # Simulate fetching KYC details (you can connect to DB or other services here)
         kyc_details, status_log = get_kyc_details(db_session, kyc_id=kyc_id)
         data= {
@@ -250,7 +359,7 @@ def kyc_detail(
                     "changed_at":status_log.changed_at.isoformat() if status_log.changed_at else None,
                     "submitted_at":kyc_details.submitted_at.isoformat() if kyc_details.submitted_at else None,
                     "ai_notes":kyc_details.ai_notes or {},
-                    "details":KycDetailsDataDTO(**(kyc_details.data or {}))
+                    "details":KycDetailsDataDTO(**hydrate_kyc_images(kyc_details.data))
                 }
         response_dto = KycDashboardDetailsResponseDTO(
             success=True,
@@ -293,7 +402,7 @@ def kyc_detail(
         existing_data = kyc_record.data or {} 
         user_name = existing_data.get("name", "")
         email = existing_data.get("emailId","")
-        email_manager = EmailManager(smtp_server, smtp_port, sender_email, sender_password)
+        email_manager = EmailManager(smtp_server, smtp_port, sender_email, sender_password, dispatcher=get_mail_dispatcher())
         background_tasks.add_task(
             email_manager.send_congrats_email,
             recipient_email=email,
@@ -344,7 +453,7 @@ def kyc_detail(
             data={"kyc_id": re_kycid, "status": "pending"}
         )
       
-        email_manager = EmailManager(smtp_server, smtp_port, sender_email, sender_password)
+        email_manager = EmailManager(smtp_server, smtp_port, sender_email, sender_password, dispatcher=get_mail_dispatcher())
         background_tasks.add_task (email_manager.send_rekyc_email,
             recipient_email=re_kyc_data.get("user_data").get("email"),
             user_name = re_kyc_data.get("user_data", {}).get("user_name", ""),
@@ -387,4 +496,43 @@ def kyc_detail(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server Error: {str(e)}")
     
-    
\ No newline at end of file
+    
+@router.get("/jobs/{job_id}")
+def job_status(
+    job_id: int = Path(..., description="Background job ID returned when the work was queued"),
+    db_session: Session = Depends(db.get_db),
+    access_token: Optional[str] = Cookie(None)):
+    try:
+        # Validate token in cookies
+        if not access_token:
+            raise HTTPException(status_code=401, detail="Missing JWT token in cookies")
+
+        user_data = verify_access_token(access_token)
+        admin_id = user_data.get("user_id")
+
+        if not admin_id:
+            raise HTTPException(status_code=400, detail="Invalid token payload")
+
+        job = get_job(db_session, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail=f"Job ID {job_id} not found")
+
+        response_dto = BaseResponse(
+            success=True,
+            message=f"Job {job_id} is {job.status}",
+            data={
+                "job_id": job.job_id,
+                "job_type": job.job_type,
+                "status": job.status,
+                "attempts": job.attempts,
+                "max_attempts": job.max_attempts,
+                "last_error": job.last_error,
+                "run_after": job.run_after.isoformat() if job.run_after else None,
+                "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+            }
+        )
+        return asdict(response_dto)
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server Error: {str(e)}")
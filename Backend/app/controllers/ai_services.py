@@ -1,22 +1,39 @@
 import os
 import asyncio
-import pandas as pd
 from fastapi import APIRouter, HTTPException, Query, Request
-from models import TamperRequestDTO, TamperResponseDTO, LivenessRequestDTO, LivenessResponseDTO, BaseResponse
-from kyc_client import LivenessService, TamperDetectionService
+from models import TamperRequestDTO, TamperResponseDTO, LivenessRequestDTO, LivenessResponseDTO, PincodeBatchRequestDTO, BaseResponse
+from kyc_client import AsyncLivenessService, AsyncTamperDetectionService
 from pydantic import BaseModel
-from services.ai.manager import bg_tamper_review_generation
+from services.jobs import enqueue_job_async, TAMPER_REVIEW_JOB
+from kyc_db import async_session_maker
+from services.compute import get_compute_pool, store_image, ComputePoolBusyError
+from services.pincode import load_pincode_index
+from functools import lru_cache
 router = APIRouter(prefix="/api/ai", tags=["AI Services"])
 
 # CSV_PATH = os.getenv("PIN_CSV_PATH")
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CSV_PATH = os.path.join(BASE_DIR, "..", "Pincode.csv")
 CSV_PATH = os.path.abspath(CSV_PATH)
+PIN_INDEX_PATH = os.getenv("PIN_INDEX_PATH", os.path.splitext(CSV_PATH)[0] + ".bin")
+MAX_PIN_BATCH_SIZE = int(os.getenv("MAX_PIN_BATCH_SIZE", "10000"))
 
-try:
-    pincode_df = pd.read_csv(CSV_PATH, dtype={"Pincode": str}, encoding='latin1')
-except Exception as e:
-    raise Exception(f"Failed to load CSV: {e}")
+@lru_cache()
+def get_pincode_index():
+    """
+    Loaded on first use. The compiled index is mmapped, so every worker shares
+    the same pages; it is recompiled from the CSV when stale.
+    """
+    try:
+        return load_pincode_index(CSV_PATH, PIN_INDEX_PATH)
+    except Exception as e:
+        raise Exception(f"Failed to load pincode data: {e}")
+
+async def get_pincode_index_async():
+    # A cold index may need compiling from the CSV, which must not block the event loop
+    if get_pincode_index.cache_info().currsize:
+        return get_pincode_index()
+    return await asyncio.to_thread(get_pincode_index)
 
 @router.post("/tamper-check", response_model=TamperResponseDTO)
 async def tamper_check(request: TamperRequestDTO):
@@ -28,8 +45,8 @@ async def tamper_check(request: TamperRequestDTO):
         kyc_id = request.kyc_id
         if not base_64:
             raise HTTPException(status_code=400, detail="Missing 'image_base64' in request body")
-        tamper_checker = TamperDetectionService(api_key=api_key)
-        result = tamper_checker.analyze_base64(base_64)
+        tamper_checker = AsyncTamperDetectionService(api_key=api_key)
+        result = await tamper_checker.analyze_base64(base_64)
         if "status" in result and result["status"] == "error":
             return TamperResponseDTO(
                 success=False,
@@ -37,9 +54,15 @@ async def tamper_check(request: TamperRequestDTO):
                 data={"error": result["message"]}
             )
 
-        asyncio.create_task(
-            bg_tamper_review_generation(result, kyc_id, base_64)
-        )
+        # The image goes to the blob store so the job row only carries its reference;
+        # decoding it is CPU-bound, so it happens in the compute pool
+        image_ref = await get_compute_pool().run_async(store_image, base_64)
+        async with async_session_maker() as session:
+            await enqueue_job_async(
+                session,
+                TAMPER_REVIEW_JOB,
+                {"kyc_id": kyc_id, "result": result, "image_ref": image_ref},
+            )
         return TamperResponseDTO(
             success=True,
             message="Tamper detection completed successfully",
@@ -47,12 +70,14 @@ async def tamper_check(request: TamperRequestDTO):
         )
 
 
+    except (HTTPException, ComputePoolBusyError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/liveness-check", response_model=LivenessResponseDTO)
-def liveness_check(request: LivenessRequestDTO):
+async def liveness_check(request: LivenessRequestDTO):
     try:
         api_key = os.getenv("OPENAI_API_KEY") 
         if not api_key:
@@ -60,8 +85,8 @@ def liveness_check(request: LivenessRequestDTO):
         base_64 = request.image_base64
         if not base_64:
             raise HTTPException(status_code=400, detail="Missing 'image_base64' in request body")
-        liveness_checker = LivenessService(api_key=api_key)
-        result = liveness_checker.analyze_base64(base_64)
+        liveness_checker = AsyncLivenessService(api_key=api_key)
+        result = await liveness_checker.analyze_base64(base_64)
         if "status" in result and result["status"] == "error":
             return LivenessResponseDTO(
                 success=False,
@@ -83,23 +108,21 @@ def liveness_check(request: LivenessRequestDTO):
     
     
 @router.get("/pin/data", response_model=BaseResponse)
-def get_pin_data(pin_code: int = Query(..., description="Pin Code to verify and fetch details")):
+async def get_pin_data(pin_code: int = Query(..., description="Pin Code to verify and fetch details")):
     try:
-        # Convert pincode to string for matching CSV
         pin_str = str(pin_code)
 
-        # Check if pincode exists in CSV
-        row = pincode_df[pincode_df["Pincode"] == pin_str]
+        # O(1) dict lookup - cheap enough to run directly on the event loop
+        location = (await get_pincode_index_async()).lookup(pin_code)
 
-        if row.empty:
+        if location is None:
             return BaseResponse(
                 success=False,
                 message="Pin code not found",
                 data=None
             )
 
-        district = row.iloc[0]["District"]
-        state = row.iloc[0]["StateName"]
+        district, state = location
 
         return BaseResponse(
             success=True,
@@ -112,4 +135,39 @@ def get_pin_data(pin_code: int = Query(..., description="Pin Code to verify and
         )
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/pin/batch", response_model=BaseResponse)
+async def get_pin_data_batch(request: PincodeBatchRequestDTO):
+    try:
+        pin_codes = list(dict.fromkeys(request.pin_codes))  # de-duplicate, keep order
+        if not pin_codes:
+            raise HTTPException(status_code=400, detail="Missing 'pin_codes' in request body")
+        if len(pin_codes) > MAX_PIN_BATCH_SIZE:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_PIN_BATCH_SIZE} pin codes per request")
+
+        pincode_index = await get_pincode_index_async()
+        results = {}
+        not_found = []
+        for pin_code in pin_codes:
+            location = pincode_index.lookup(pin_code)
+            if location is None:
+                not_found.append(str(pin_code))
+                continue
+            district, state = location
+            results[str(pin_code)] = {"district": district, "state": state}
+
+        return BaseResponse(
+            success=True,
+            message="Pin details fetched successfully",
+            data={
+                "results": results,
+                "not_found": not_found
+            }
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,37 @@
+import hashlib
+from typing import Optional
+from fastapi import Request, Response
+
+# KYC payloads hold personal data: never store them in shared caches, and have
+# the browser revalidate every time (a 304 costs one small version query).
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def make_etag(*parts, weak: bool = False) -> str:
+    """Quoted ETag built from a row version plus whatever selects the representation."""
+    digest = hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()[:32]
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check using weak comparison, as RFC 9110 requires for GET."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def not_modified(request: Request, etag: str, cache_control: str = PRIVATE_REVALIDATE) -> Optional[Response]:
+    """A 304 response when the client's copy is current, otherwise None."""
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+    return None
@@ -1,15 +1,18 @@
 import asyncio
 import os
-from fastapi import APIRouter, Depends, BackgroundTasks, Response
+from fastapi import APIRouter, Depends, BackgroundTasks, Response, Request, HTTPException, UploadFile, File, Form, Query
+from typing import Optional
 from models.user import PersonalInfo
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from models.user import AddressForm
-from models.user import DocumentsForm
+from models.user import DocumentsForm, Documents
 from models.user import livenessInfo
 from models.user import UserInfo    
-from services.user import add_personal_info,add_address_info ,add_documents_info, add_liveness_info, get_kyc_details, generate_kyc_pdf, submit_user, get_kyc_manager, kyra_match_agent_bg
+from services.user import add_personal_info,add_address_info ,add_documents_info, add_liveness_info, get_kyc_details, generate_kyc_pdf, get_kyc_pdf_state, submit_user, get_kyc_manager, serialize_kyc_details, get_kyc_image, get_kyc_thumbnail, KYC_IMAGE_FIELDS, parse_kyc_fields, get_kyc_projection, get_kyc_version, kyc_accepts_changes
 from sqlalchemy.ext.asyncio import AsyncSession
+from services.user.images import store_image_upload, ImageTooLargeError, InvalidImageError
 from kyc_db import  db
+from controllers.http_cache import make_etag, not_modified, etag_matches, PRIVATE_REVALIDATE
 
 
 router = APIRouter(
@@ -19,13 +22,82 @@ router = APIRouter(
 )
 
 @router.get("/{kyc_id}")
-def get_user(kyc_id: int, db: AsyncSession = Depends(db.get_db)):
+def get_user(
+    kyc_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated KYC data keys to return; images come back as links"),
+    view: Optional[str] = Query(None, description="'summary' for the wizard fields without images"),
+    db: AsyncSession = Depends(db.get_db)):
+    keys = parse_kyc_fields(fields, view)
+    version = get_kyc_version(kyc_id, db)
+    if version:
+        etag = make_etag(version, "user", ",".join(keys) if keys is not None else "full")
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = PRIVATE_REVALIDATE
+    if keys is not None:
+        return {"message": f"Fetch Data for KycID : {kyc_id} successfully", "data": get_kyc_projection(kyc_id, keys, db)}
     user_data = get_kyc_details(kyc_id,db)
-    return {"message": f"Fetch Data for KycID : {kyc_id} successfully", "data": user_data}
+    return {"message": f"Fetch Data for KycID : {kyc_id} successfully", "data": serialize_kyc_details(user_data)}
+
+@router.get("/{kyc_id}/images/{image_name}")
+def get_image(kyc_id: int, image_name: str, request: Request, v: Optional[str] = None, db=Depends(db.get_db)):
+    if image_name not in KYC_IMAGE_FIELDS:
+        return JSONResponse(
+            content={"message": f"Unknown image '{image_name}'", "data": None},
+            status_code=404
+        )
+    image = get_kyc_image(kyc_id, image_name, db)
+    if not image:
+        return JSONResponse(
+            content={"message": "Image not found", "data": None},
+            status_code=404
+        )
+    chunks, content_type, digest = image
+    etag = f'"{digest}"'
+    if v and digest.startswith(v):
+        # Versioned URL from the slim KYC view - the content behind it never changes
+        cache_control = "private, max-age=31536000, immutable"
+    else:
+        cache_control = "private, no-cache"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return StreamingResponse(chunks, media_type=content_type, headers=headers)
+
+@router.get("/{kyc_id}/thumbnail")
+def get_thumbnail(kyc_id: int, request: Request, v: Optional[str] = None, db=Depends(db.get_db)):
+    thumbnail = get_kyc_thumbnail(kyc_id, db)
+    if not thumbnail:
+        return JSONResponse(
+            content={"message": "Thumbnail not found", "data": None},
+            status_code=404
+        )
+    thumbnail_bytes, digest = thumbnail
+    etag = f'"{digest}"'
+    if v and digest.startswith(v):
+        # Versioned URL from the dashboard - the content behind it never changes
+        cache_control = "private, max-age=31536000, immutable"
+    else:
+        cache_control = "private, max-age=300"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=thumbnail_bytes, media_type="image/jpeg", headers=headers)
+
+def _save_step(step, kyc_id: int, info, db):
+    # Images arrive as client-sent base64 or blob references; bad ones are the client's error
+    try:
+        return step(kyc_id, info, db)
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/{kyc_id}/personal")
 def get_users(kyc_id: int,info: PersonalInfo,db: AsyncSession = Depends(db.get_db)):
-    info = add_personal_info(kyc_id,info,db)
+    info = _save_step(add_personal_info, kyc_id, info, db)
     return {"message": "Personal info saved successfully", "data": info}
 
 @router.post("/{kyc_id}/address")
@@ -35,50 +107,119 @@ def add_address(kyc_id: int,info:AddressForm,db: AsyncSession = Depends(db.get_d
 
 @router.post("/{kyc_id}/documents")
 def add_documents(kyc_id: int,info:DocumentsForm,db: AsyncSession = Depends(db.get_db)):
-    info = add_documents_info(kyc_id,info,db)
+    info = _save_step(add_documents_info, kyc_id, info, db)
     return {"message": "Personal info saved successfully", "data": info}
 
 @router.post("/{kyc_id}/liveness")
 def add_liveness(kyc_id: int,info:livenessInfo,db: AsyncSession = Depends(db.get_db)):
-    info = add_liveness_info(kyc_id,info,db)
+    info = _save_step(add_liveness_info, kyc_id, info, db)
     return {"message": "Personal info saved successfully", "data": info}
 
+# Multipart variants of the wizard steps: image files are streamed straight to
+# the blob store instead of arriving as base64 strings inside JSON. Nothing is
+# stored for a KYC that is no longer PENDING.
+NOT_PENDING_RESPONSE = {"message": "KYC is not in pending status", "data": None}
+
+def _store_upload(upload: Optional[UploadFile]) -> Optional[str]:
+    if upload is None:
+        return None
+    try:
+        return store_image_upload(upload.file, upload.content_type)
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidImageError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+@router.post("/{kyc_id}/personal/upload")
+def add_personal_upload(
+    kyc_id: int,
+    name: str = Form(...),
+    gender: str = Form(...),
+    dob: str = Form(...),
+    emailId: str = Form(...),
+    mobileNo: str = Form(...),
+    fatherName: str = Form(...),
+    photoImage: Optional[UploadFile] = File(None),
+    db: AsyncSession = Depends(db.get_db)):
+    if not kyc_accepts_changes(kyc_id, db):
+        return NOT_PENDING_RESPONSE
+    info = PersonalInfo(
+        name=name,
+        gender=gender,
+        dob=dob,
+        emailId=emailId,
+        mobileNo=mobileNo,
+        fatherName=fatherName,
+        photoImage=_store_upload(photoImage)
+    )
+    info = _save_step(add_personal_info, kyc_id, info, db)
+    return {"message": "Personal info saved successfully", "data": info}
+
+@router.post("/{kyc_id}/documents/upload")
+def add_documents_upload(
+    kyc_id: int,
+    permanentOvdType: str = Form(...),
+    permanentOvdImage: UploadFile = File(...),
+    corporateOvdType: str = Form(...),
+    corporateOvdImage: UploadFile = File(...),
+    db: AsyncSession = Depends(db.get_db)):
+    if not kyc_accepts_changes(kyc_id, db):
+        return NOT_PENDING_RESPONSE
+    info = DocumentsForm(
+        permanentAddressDocuments=Documents(ovdType=permanentOvdType, ovdImage=_store_upload(permanentOvdImage)),
+        corporateAddressDocuments=Documents(ovdType=corporateOvdType, ovdImage=_store_upload(corporateOvdImage))
+    )
+    info = _save_step(add_documents_info, kyc_id, info, db)
+    return {"message": "Documents saved successfully", "data": info}
+
+@router.post("/{kyc_id}/liveness/upload")
+def add_liveness_upload(
+    kyc_id: int,
+    livenessStatus: str = Form(...),
+    livenessScore: float = Form(...),
+    livenessImage: UploadFile = File(...),
+    db: AsyncSession = Depends(db.get_db)):
+    if not kyc_accepts_changes(kyc_id, db):
+        return NOT_PENDING_RESPONSE
+    info = livenessInfo(
+        livenessStatus=livenessStatus,
+        livenessScore=livenessScore,
+        livenessImage=_store_upload(livenessImage)
+    )
+    info = _save_step(add_liveness_info, kyc_id, info, db)
+    return {"message": "Liveness info saved successfully", "data": info}
+
 @router.get("/{kyc_id}/submit")
 async def create_user(backgroundtasks: BackgroundTasks, kyc_id: int,db: AsyncSession = Depends(db.get_db)):
-    smtp_server = os.getenv("SMTP_SERVER")
-    smtp_port = int(os.getenv("SMTP_PORT"))
-    sender_email = os.getenv("SMTP_SENDER_EMAIL")
-    sender_password = os.getenv("SMTP_SENDER_PASSWORD")
-    
-    is_verified = get_kyc_details(kyc_id,db)
-    if( not is_verified):
+    found_id, job_id = submit_user(kyc_id,db)
+    if( not found_id):
         return {"message": f"KYC ID : {kyc_id} not found"}
-    updated_status = submit_user(kyc_id,db)
-    if(updated_status):
-        data = get_kyc_manager(kyc_id,db)
-        # print(f"Data to be sent to Kyra Match Agent: {data.data}")
-        asyncio.create_task(
-            kyra_match_agent_bg(kyc_id, data, smtp_server, smtp_port, sender_email, sender_password)
-        )
-        
-        return {"message": f"User with KYC ID : {kyc_id} submitted successfully"}
+    if(job_id):
+        # Kyra match runs on the job worker, which retries it if this process dies
+        return {"message": f"User with KYC ID : {kyc_id} submitted successfully", "job_id": job_id}
     
     return {"message": f"KYC ID {kyc_id} is not in pending status"}
     
 @router.get("/{kyc_id}/pdf")
-def download_kyc_pdf(kyc_id: int, db=Depends(db.get_db)):
-    pdf_bytes = generate_kyc_pdf(kyc_id, db)
-
-    if not pdf_bytes:
+def download_kyc_pdf(kyc_id: int, request: Request, db=Depends(db.get_db)):
+    state = get_kyc_pdf_state(kyc_id, db)
+    if not state:
         return JSONResponse(
             content={"message": "KYC ID not found or invalid status", "data": None},
             status_code=404
         )
-    return Response(
-        content=pdf_bytes,
+    # Weak: a re-render of the same data differs in its embedded "generated" timestamp
+    etag = make_etag(state.version, "pdf", weak=True)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    return StreamingResponse(
+        generate_kyc_pdf(kyc_id, db, state),
         media_type="application/pdf",
         headers={
-            "Content-Disposition": f"attachment; filename=KYC_{kyc_id}.pdf"
+            "Content-Disposition": f"attachment; filename=KYC_{kyc_id}.pdf",
+            "ETag": etag,
+            "Cache-Control": PRIVATE_REVALIDATE,
         }
     )
     
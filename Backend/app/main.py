@@ -1,16 +1,24 @@
+import asyncio
+import logging
+from dotenv import load_dotenv
+# Before the app imports: their modules read settings from the environment at import time
+load_dotenv()
+
 from fastapi import FastAPI, Depends, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from controllers.ai_services import router as ai_services
+from controllers.ai_services import router as ai_services, get_pincode_index_async
 from controllers.authentication import router as authentication
 from controllers.admin import router as admin
 from controllers.user import router as user
 
 from models.base_response import BaseResponse
+from kyc_client import close_async_openai_clients, get_kyc_client_pool
+from kyc_email_sender import get_mail_dispatcher
+from services.jobs import job_worker, JOB_WORKER_ENABLED
+from services.compute import shutdown_compute_pool, ComputePoolBusyError
 
-from dotenv import load_dotenv
-load_dotenv()
 # Import routers
 
 
@@ -35,6 +43,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def start_job_worker():
+    # Background work (Kyra match, tamper review) is persisted in background_jobs and run here
+    if JOB_WORKER_ENABLED:
+        job_worker.start()
+
+@app.on_event("shutdown")
+async def stop_job_worker():
+    await job_worker.stop()
+    # Jobs render PDFs in the compute pool, so its processes go after the worker
+    shutdown_compute_pool()
+
+@app.on_event("startup")
+async def start_mail_dispatcher():
+    # Outbound mail is queued and sent over pooled SMTP connections
+    await get_mail_dispatcher().start()
+
+@app.on_event("shutdown")
+async def stop_mail_dispatcher():
+    await get_mail_dispatcher().stop()
+
+@app.on_event("startup")
+async def load_pincode_data():
+    # Open (or compile, when missing or stale) the pincode index before the first lookup
+    try:
+        await get_pincode_index_async()
+    except Exception as e:
+        logging.warning(f"Pincode index not loaded at startup, it is retried on first use: {e}")
+
+@app.on_event("startup")
+async def warm_kyc_client_pool():
+    # Build the LangChain clients once here instead of on the first submissions
+    try:
+        await asyncio.to_thread(get_kyc_client_pool().warm_up)
+    except Exception as e:
+        logging.warning(f"KYC client pool warm-up failed, clients will be created on demand: {e}")
+
+@app.on_event("shutdown")
+async def close_openai_connections():
+    # Release the pooled OpenAI HTTP connections shared by the AI services
+    await close_async_openai_clients()
+    get_kyc_client_pool().close()
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     # Get the first error
@@ -51,6 +102,15 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         ).model_dump()
     )
 
+@app.exception_handler(ComputePoolBusyError)
+async def compute_pool_busy_handler(request: Request, exc: ComputePoolBusyError):
+    # Shed load: the client retries once CPU-bound work has drained
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 # Include routers (controllers)
 app.include_router(user)
 app.include_router(ai_services)
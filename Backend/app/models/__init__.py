@@ -6,4 +6,5 @@ from .kyc_initiate import KycInitiateRequestDTO, KycInitiateResponseDTO
 from .kyc_dashboard import KycDashboardRequestDTO, KycDashboardResponseDTO
 from .kyc_data import KycDashboardDetailsResponseDTO, KycDetailsDataDTO
 from .admin_dashboard import AdminDashboardResponseDTO, KycMainDashboardDataDTO
+from .pincode import PincodeBatchRequestDTO
 from .user import UserInfo
@@ -14,6 +14,7 @@ class KycDetailsDataDTO:
     mobileNo: Optional[str] = None
     fatherName: Optional[str] = None
     photoImage: Optional[str] = None
+    photoThumbnail: Optional[str] = None
     livenessImage: Optional[str] = None
     livenessScore: Optional[float] = None
     livenessStatus: Optional[str] = None
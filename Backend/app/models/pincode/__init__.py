@@ -0,0 +1 @@
+from .pincode_batch_request_dto import PincodeBatchRequestDTO
\ No newline at end of file
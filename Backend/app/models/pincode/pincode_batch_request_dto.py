@@ -0,0 +1,6 @@
+from dataclasses import dataclass, field
+from typing import List
+
+@dataclass
+class PincodeBatchRequestDTO():
+    pin_codes: List[int] = field(default_factory=list)
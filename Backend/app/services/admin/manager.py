@@ -1,13 +1,17 @@
+import json
+import base64
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional
 from fastapi import HTTPException
 from sqlalchemy.future import select
-from sqlalchemy import String, desc, func
+from sqlalchemy import String, desc, func, insert, tuple_
 from kyc_db import  db
-from kyc_db import User, KYC, KYCStatusLog, KYCStatus
-from datetime import date, datetime
+from kyc_db import User, KYC, KYCStatusLog, KYCStatus, KYCPdf
+from kyc_storage import is_blob_ref, parse_blob_ref
+from datetime import datetime
 from models.kyc_dashboard.kyc_dashboard_request_dto import KycDashboardRequestDTO
+from .summary_cache import build_summary, get_summary_backend, record_kyc_initiated, record_status_change, summary_today
 
 def add_kyc_status_entry(db_session: Session, user_id: int, admin_id: Optional[int]) -> int:
     try:
@@ -47,9 +51,70 @@ def add_kyc_entry(db_session: Session, kyc_id: int, user_id: int, name: str, ema
             submitted_at=datetime.utcnow()
         )
         db_session.add(kyc_entry)
+        return kyc_entry
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to insert KYC entry: {str(e)}")
     
+def bulk_initiate_kyc(db_session: Session, user_id: int, admin_id: Optional[int], customers: list, chunk_size: int = 5000) -> List[int]:
+    """
+    Create the KYCStatusLog and KYC rows for many customers in one transaction.
+    Rows go out as multi-row INSERT ... VALUES ... RETURNING statements of
+    `chunk_size` rows each; returns the new kyc_ids in the order of `customers`.
+    """
+    try:
+        user = db_session.query(User).filter(User.user_id == user_id).first()
+        if not user:
+            raise HTTPException(
+                status_code=400,
+                detail=f"User with id={user_id} does not exist"
+            )
+        now = datetime.utcnow()
+        kyc_ids: List[int] = []
+        for start in range(0, len(customers), chunk_size):
+            chunk = customers[start:start + chunk_size]
+            new_ids = db_session.scalars(
+                insert(KYCStatusLog).returning(KYCStatusLog.kyc_id, sort_by_parameter_order=True),
+                [
+                    {"user_id": user_id, "admin_id": admin_id, "status": KYCStatus.PENDING.value, "changed_at": now}
+                    for _ in chunk
+                ],
+            ).all()
+            db_session.execute(
+                insert(KYC),
+                [
+                    {
+                        "kyc_id": kyc_id,
+                        "user_id": user_id,
+                        "kyc_email": customer.email,
+                        "kyc_mobile": customer.mobile_number,
+                        "data": {
+                            'emailId': customer.email,
+                            'name': customer.name,
+                            'mobileNo': customer.mobile_number
+                        },
+                        "submitted_at": now,
+                    }
+                    for kyc_id, customer in zip(new_ids, chunk)
+                ],
+            )
+            kyc_ids.extend(new_ids)
+        db_session.commit()
+        record_kyc_initiated(
+            admin_id,
+            [{"kyc_id": kyc_id, "name": customer.name} for kyc_id, customer in zip(kyc_ids, customers)],
+            now
+        )
+        return kyc_ids
+    except HTTPException:
+        db_session.rollback()
+        raise
+    except Exception as e:
+        db_session.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to insert KYC entries: {str(e)}")
+
+def get_kyc_name(db_session: Session, kyc_id: int) -> Optional[str]:
+    return db_session.query(KYC.data["name"].astext).filter(KYC.kyc_id == kyc_id).scalar()
+
 def approve_kyc(db_session: Session, kyc_id: int, admin_id: int):
     """Approve a KYC request."""
     try:
@@ -62,12 +127,17 @@ def approve_kyc(db_session: Session, kyc_id: int, admin_id: int):
             raise HTTPException(status_code=404, detail="KYC status record not found")
 
     # Update values
+        old_status, old_admin_id = existing_status.status, existing_status.admin_id
         existing_status.status = KYCStatus.APPROVED.value
         existing_status.admin_id = admin_id
         existing_status.changed_at = datetime.utcnow()
 
         db_session.commit()
         db_session.refresh(existing_status)
+        record_status_change(
+            kyc_id, old_admin_id, admin_id, old_status, existing_status.status,
+            changed_at=existing_status.changed_at, name=get_kyc_name(db_session, kyc_id), name_known=True
+        )
         return existing_status.kyc_id
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to approve KYC: {str(e)}")
@@ -84,12 +154,17 @@ def reject_kyc(db_session: Session, kyc_id: int, admin_id: int):
             raise HTTPException(status_code=404, detail="KYC status record not found")
 
     # Update values
+        old_status, old_admin_id = existing_status.status, existing_status.admin_id
         existing_status.status = KYCStatus.REJECTED.value
         existing_status.admin_id = admin_id
         existing_status.changed_at = datetime.utcnow()
 
         db_session.commit()
         db_session.refresh(existing_status)
+        record_status_change(
+            kyc_id, old_admin_id, admin_id, old_status, existing_status.status,
+            changed_at=existing_status.changed_at, name=get_kyc_name(db_session, kyc_id), name_known=True
+        )
         return existing_status.kyc_id
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to approve KYC: {str(e)}")
@@ -109,6 +184,7 @@ def initiate_rekyc(db_session: Session, kyc_id: int, admin_id: int):
         raise HTTPException(404, "KYC record not found")
 
     # Update status
+    old_status, old_admin_id = status_row.status, status_row.admin_id
     status_row.status = KYCStatus.PENDING.value
     status_row.admin_id = admin_id
     status_row.changed_at = datetime.utcnow()
@@ -117,9 +193,107 @@ def initiate_rekyc(db_session: Session, kyc_id: int, admin_id: int):
     # Reset KYC.data to {}
     kyc_row.data = {}
 
+    # The stored PDF describes the data being discarded
+    stored_pdf = db_session.query(KYCPdf).filter(KYCPdf.kyc_id == kyc_id).first()
+    if stored_pdf:
+        db_session.delete(stored_pdf)
+
     db_session.commit()
+    if stored_pdf:
+        # Imported here: services.user pulls in summary_cache, i.e. this package
+        from services.user.pdf_cache import discard_pdf_blob
+        discard_pdf_blob(stored_pdf.blob_digest)
+    # The reset data has no name, which is what the dashboard query would show too
+    record_status_change(
+        kyc_id, old_admin_id, admin_id, old_status, KYCStatus.PENDING,
+        changed_at=status_row.changed_at, name=None, name_known=True
+    )
     return {"kyc_id": kyc_id, "user_data": user_data, "status": "pending"}
     
+def encode_dashboard_cursor(submitted_at: Optional[datetime], kyc_id: int) -> str:
+    """Opaque keyset cursor over (submitted_at, kyc_id)."""
+    payload = {"s": submitted_at.isoformat() if submitted_at else None, "k": kyc_id}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+def decode_dashboard_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        submitted_at = datetime.fromisoformat(payload["s"]) if payload.get("s") else None
+        return submitted_at, int(payload["k"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+def thumbnail_url(kyc_id: int, thumbnail_ref: Optional[str], has_photo: bool) -> Optional[str]:
+    """Dashboard rows link to the thumbnail endpoint; the digest versions the URL for caching."""
+    if is_blob_ref(thumbnail_ref):
+        return f"/api/user/kyc/{kyc_id}/thumbnail?v={parse_blob_ref(thumbnail_ref)[:16]}"
+    if has_photo:
+        # Legacy row - the endpoint builds the thumbnail from the photo
+        return f"/api/user/kyc/{kyc_id}/thumbnail"
+    return None
+
+def build_dashboard_conditions(admin_id: int, search_field=None, search_value=None, status=None) -> list:
+    """WHERE clauses shared by the dashboard listing and the CSV export."""
+    conditions = [KYCStatusLog.admin_id == admin_id]
+
+    if status:
+        status = status.lower()
+        allowed = ["approved", "pending", "under_review", "rejected"]
+        if status not in allowed:
+            raise HTTPException(status_code=400, detail="Invalid status filter")
+        conditions.append(KYCStatusLog.status == status)
+
+    if search_field and search_value:
+        if search_field == "kyc_id":
+            try:
+                kyc_id = int(search_value)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="KYC ID search value must be a number")
+            conditions.append(KYC.kyc_id == kyc_id)
+
+        elif search_field == "user_name":
+            # cast to TEXT to allow index scanning
+            conditions.append(
+                KYC.data["name"].astext.cast(String).ilike(f"%{search_value}%")
+            )
+
+        elif search_field == "email":
+            conditions.append(KYC.kyc_email.ilike(f"%{search_value}%"))
+
+    return conditions
+
+def iter_dashboard_export_rows(db_session: Session, conditions: list, batch_size: int = 1000):
+    """
+    Yields lists of export rows using a server-side cursor, so only one batch
+    is held in memory regardless of how many rows match.
+    """
+    query = (
+        select(
+            KYCStatusLog.kyc_id,
+            KYC.data["name"].astext.label("user_name"),
+            KYC.kyc_email,
+            KYCStatusLog.status,
+            KYC.submitted_at
+        )
+        .join(KYC, KYC.kyc_id == KYCStatusLog.kyc_id)
+        .where(*conditions)
+        .order_by(KYC.submitted_at.desc(), KYC.kyc_id.desc())
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    result = db_session.execute(query)
+    for partition in result.partitions():
+        yield [
+            (
+                row.kyc_id,
+                row.user_name,
+                row.kyc_email,
+                row.status if isinstance(row.status, str) else row.status.value,
+                row.submitted_at.isoformat() if row.submitted_at else None,
+            )
+            for row in partition
+        ]
+
 def get_dashboard_data(
     db_session: Session,
     admin_id: int,
@@ -127,39 +301,36 @@ def get_dashboard_data(
     search_value=None,
     status=None,
     page=0,
-    size=10
+    size=10,
+    cursor: Optional[str] = None
 ):
+    """
+    Returns (records, total_count, next_cursor).
+    With cursor=None the page/size (OFFSET) mode is used and next_cursor is
+    always None. Passing a cursor -
+    an empty string for the first page - switches to keyset pagination, which
+    costs the same at any depth; the count is then only computed for the first page.
+    """
     try:
         # --- Base WHERE conditions (reused for count & data) ---
-        conditions = [KYCStatusLog.admin_id == admin_id]
-
-        if status:
-            status = status.lower()
-            allowed = ["approved", "pending", "under_review", "rejected"]
-            if status not in allowed:
-                raise HTTPException(status_code=400, detail="Invalid status filter")
-            conditions.append(KYCStatusLog.status == status)
-
-        if search_field and search_value:
-            if search_field == "kyc_id":
-                conditions.append(KYC.kyc_id == int(search_value))
-
-            elif search_field == "user_name":
-                # cast to TEXT to allow index scanning
-                conditions.append(
-                    KYC.data["name"].astext.cast(String).ilike(f"%{search_value}%")
-                )
-
-            elif search_field == "email":
-                conditions.append(KYC.kyc_email.ilike(f"%{search_value}%"))
-
-        # --- FAST COUNT QUERY ---
-        total_count = db_session.execute(
-            select(func.count())
-            .select_from(KYCStatusLog)
-            .join(KYC, KYC.kyc_id == KYCStatusLog.kyc_id)
-            .where(*conditions)
-        ).scalar()
+        conditions = build_dashboard_conditions(admin_id, search_field, search_value, status)
+
+        keyset_mode = cursor is not None
+        total_count = None
+        if not keyset_mode or cursor == "":
+            # --- FAST COUNT QUERY ---
+            total_count = db_session.execute(
+                select(func.count())
+                .select_from(KYCStatusLog)
+                .join(KYC, KYC.kyc_id == KYCStatusLog.kyc_id)
+                .where(*conditions)
+            ).scalar()
+
+        if keyset_mode and cursor:
+            last_submitted_at, last_kyc_id = decode_dashboard_cursor(cursor)
+            conditions.append(
+                tuple_(KYC.submitted_at, KYC.kyc_id) < tuple_(last_submitted_at, last_kyc_id)
+            )
 
         # --- PAGED DATA QUERY (only required columns) ---
         query = (
@@ -168,15 +339,19 @@ def get_dashboard_data(
                 KYCStatusLog.status,
                 KYC.kyc_email,
                 KYC.data["name"].astext.label("user_name"),
-                KYC.data["photoImage"].astext.label("photoImage"),
+                # Only the small thumbnail reference - never the full photo
+                KYC.data["photoThumbnail"].astext.label("photoThumbnail"),
+                KYC.data.has_key("photoImage").label("hasPhoto"),
                 KYC.submitted_at
             )
             .join(KYC, KYC.kyc_id == KYCStatusLog.kyc_id)
             .where(*conditions)
-            .order_by(KYC.submitted_at.desc())
+            # kyc_id breaks ties so the order is total and matches idx_kyc_submitted_at_kyc_id
+            .order_by(KYC.submitted_at.desc(), KYC.kyc_id.desc())
             .limit(size)
-            .offset(page * size)
         )
+        if not keyset_mode:
+            query = query.offset(page * size)
 
         result = db_session.execute(query).all()
 
@@ -188,13 +363,20 @@ def get_dashboard_data(
                 "kyc_id": r["kyc_id"],
                 "user_name": r["user_name"],
                 "email": r["kyc_email"],
-                "photoImage": r["photoImage"],
+                "photoThumbnailUrl": thumbnail_url(r["kyc_id"], r["photoThumbnail"], r["hasPhoto"]),
                 "status": r["status"] if isinstance(r["status"], str) else r["status"].value,
                 "submitted_at": r["submitted_at"].isoformat() if r["submitted_at"] else None,
             })
 
-        return serialized_data, total_count
+        next_cursor = None
+        if keyset_mode and result and len(result) == size:
+            last = result[-1]._mapping
+            next_cursor = encode_dashboard_cursor(last["submitted_at"], last["kyc_id"])
+
+        return serialized_data, total_count, next_cursor
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch dashboard data: {str(e)}")
 
@@ -229,7 +411,8 @@ def serialize_kyc_status_log(obj):
         "changed_at": obj.changed_at.isoformat() if getattr(obj, "changed_at", None) else None,
     }
 
-def get_main_dashboard_data(db: Session, admin_id: int) -> dict:
+def compute_dashboard_summary(db: Session, admin_id: int) -> dict:
+    """Build the dashboard summary from the database (cache miss path)."""
     sub_latest_status = (
         db.query(
             KYCStatusLog.kyc_id,
@@ -250,14 +433,9 @@ def get_main_dashboard_data(db: Session, admin_id: int) -> dict:
         func.count()
     ).group_by(latest_status_only.c.status).all())
 
-    # Ensure missing statuses return 0
-    total_pending= status_counts.get(KYCStatus.PENDING.value, 0)
-    total_under_review= status_counts.get(KYCStatus.UNDER_REVIEW.value, 0)
-    total_approved=status_counts.get(KYCStatus.APPROVED.value, 0)
-    total_rejected= status_counts.get(KYCStatus.REJECTED.value, 0)
     total_kyc_count = db.query(func.count(KYC.kyc_id)).filter(KYC.user_id == admin_id).scalar()
 
-    today = date.today()
+    today = summary_today()
     todays_kyc_count = (
         db.query(KYC)
         .filter(func.date(KYC.submitted_at) == today)
@@ -284,10 +462,33 @@ def get_main_dashboard_data(db: Session, admin_id: int) -> dict:
             "kyc_id": k.kyc_id,
             "name": k.user_name,
             "changed_at": k.changed_at.isoformat() if k.changed_at else None,
-            "status": k.status,
+            "status": k.status.value if hasattr(k.status, "value") else k.status,
         }
         for k in top_kyc_query
     ]
+    return build_summary(today, status_counts, total_kyc_count, todays_kyc_count, top_kycs)
+
+def get_main_dashboard_data(db: Session, admin_id: int) -> dict:
+    """
+    Served from the per-admin summary cache, which status changes update in
+    place (see summary_cache.record_status_change); the database is only
+    queried on a miss, after the TTL, or when the day rolls over.
+    """
+    backend = get_summary_backend()
+    summary = backend.get(admin_id)
+    if summary is None or summary["day"] != summary_today().isoformat():
+        summary = compute_dashboard_summary(db, admin_id)
+        backend.set(admin_id, summary)
+
+    status_counts = summary["counts"]
+    # Ensure missing statuses return 0
+    total_pending= status_counts.get(KYCStatus.PENDING.value, 0)
+    total_under_review= status_counts.get(KYCStatus.UNDER_REVIEW.value, 0)
+    total_approved=status_counts.get(KYCStatus.APPROVED.value, 0)
+    total_rejected= status_counts.get(KYCStatus.REJECTED.value, 0)
+    total_kyc_count = summary["total_kyc_count"]
+    todays_kyc_count = summary["todays_kyc_count"]
+    top_kycs = summary["top_kycs"]
     approval_rate = (
         round(((total_approved / total_kyc_count) * 100), 2)
         if total_kyc_count > 0 else 0
@@ -0,0 +1,253 @@
+import os
+import time
+import logging
+import threading
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Type
+from kyc_db import KYCStatus
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "SummaryBackend",
+    "MemorySummaryBackend",
+    "register_summary_backend",
+    "get_summary_backend",
+    "build_summary",
+    "summary_today",
+    "record_kyc_initiated",
+    "record_status_change",
+]
+
+DASHBOARD_SUMMARY_TTL = float(os.getenv("DASHBOARD_SUMMARY_TTL", "300"))
+TOP_KYC_LIMIT = 4
+
+# A cached summary is a plain dict:
+#   day              ISO date the "today" count refers to
+#   counts           {status: number of the admin's KYCs currently in that status}
+#   total_kyc_count  KYC rows owned by the admin
+#   todays_kyc_count KYC rows submitted on `day`
+#   top_kycs         latest TOP_KYC_LIMIT status changes, newest first
+
+
+class SummaryBackend:
+    """
+    Storage for per-admin dashboard summaries. `update` must apply `fn` to
+    the stored summary atomically; a shared backend (e.g. Redis) should
+    override it with its own compare-and-set. `fn` returns the new summary,
+    or None to drop the entry so the next read recomputes it.
+    """
+
+    def get(self, admin_id: int) -> Optional[dict]:
+        raise NotImplementedError
+
+    def set(self, admin_id: int, summary: dict) -> None:
+        raise NotImplementedError
+
+    def delete(self, admin_id: int) -> None:
+        raise NotImplementedError
+
+    def update(self, admin_id: int, fn: Callable[[dict], Optional[dict]]) -> None:
+        raise NotImplementedError
+
+
+class MemorySummaryBackend(SummaryBackend):
+    """In-process backend; entries expire after `ttl` so drift across workers is bounded."""
+
+    def __init__(self, ttl: float = DASHBOARD_SUMMARY_TTL):
+        self.ttl = ttl
+        self._data: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _get_locked(self, admin_id: int) -> Optional[dict]:
+        entry = self._data.get(admin_id)
+        if entry is None:
+            return None
+        expires_at, summary = entry
+        if expires_at < time.monotonic():
+            del self._data[admin_id]
+            return None
+        return summary
+
+    def get(self, admin_id: int) -> Optional[dict]:
+        with self._lock:
+            summary = self._get_locked(admin_id)
+            return _copy_summary(summary) if summary is not None else None
+
+    def set(self, admin_id: int, summary: dict) -> None:
+        with self._lock:
+            self._data[admin_id] = (time.monotonic() + self.ttl, _copy_summary(summary))
+
+    def delete(self, admin_id: int) -> None:
+        with self._lock:
+            self._data.pop(admin_id, None)
+
+    def update(self, admin_id: int, fn: Callable[[dict], Optional[dict]]) -> None:
+        with self._lock:
+            summary = self._get_locked(admin_id)
+            if summary is None:
+                # Nothing cached - the next read computes from the database
+                return
+            expires_at = self._data[admin_id][0]
+            updated = fn(_copy_summary(summary))
+            if updated is None:
+                del self._data[admin_id]
+            else:
+                self._data[admin_id] = (expires_at, updated)
+
+
+_BACKENDS: Dict[str, Type[SummaryBackend]] = {
+    "memory": MemorySummaryBackend,
+}
+
+
+def register_summary_backend(name: str, backend_cls: Type[SummaryBackend]) -> None:
+    """Register an additional backend (e.g. Redis) selectable via DASHBOARD_SUMMARY_BACKEND."""
+    _BACKENDS[name] = backend_cls
+    get_summary_backend.cache_clear()
+
+
+@lru_cache()
+def get_summary_backend() -> SummaryBackend:
+    backend = os.getenv("DASHBOARD_SUMMARY_BACKEND", "memory").lower()
+    if backend not in _BACKENDS:
+        raise ValueError(f"Unknown dashboard summary backend: {backend}")
+    return _BACKENDS[backend]()
+
+
+def _copy_summary(summary: dict) -> dict:
+    return {
+        **summary,
+        "counts": dict(summary["counts"]),
+        "top_kycs": [dict(k) for k in summary["top_kycs"]],
+    }
+
+
+def _status_value(status) -> Optional[str]:
+    return status.value if hasattr(status, "value") else status
+
+
+def _changed_at_key(entry: dict) -> datetime:
+    if not entry.get("changed_at"):
+        return datetime.min.replace(tzinfo=timezone.utc)
+    value = datetime.fromisoformat(entry["changed_at"])
+    # Status rows written with datetime.utcnow() are naive UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _push_top_kyc(summary: dict, entry: dict) -> dict:
+    top = [k for k in summary["top_kycs"] if k["kyc_id"] != entry["kyc_id"]]
+    top.append(entry)
+    top.sort(key=_changed_at_key, reverse=True)
+    summary["top_kycs"] = top[:TOP_KYC_LIMIT]
+    return summary
+
+
+def _safe_update(admin_id: Optional[int], fn: Callable[[dict], Optional[dict]]) -> None:
+    if admin_id is None:
+        return
+    try:
+        get_summary_backend().update(admin_id, fn)
+    except Exception as e:
+        # Never fail the request because of the cache - drop the entry instead
+        logger.warning(f"Dashboard summary update failed for admin {admin_id}: {e}")
+        try:
+            get_summary_backend().delete(admin_id)
+        except Exception:
+            pass
+
+
+def record_kyc_initiated(admin_id: int, entries: List[dict], submitted_at: datetime) -> None:
+    """
+    New PENDING KYCs created by `admin_id`. `entries` are dicts with kyc_id
+    and name. Call after the transaction has committed.
+    """
+    def apply(summary: dict) -> dict:
+        pending = KYCStatus.PENDING.value
+        summary["counts"][pending] = summary["counts"].get(pending, 0) + len(entries)
+        summary["total_kyc_count"] += len(entries)
+        # submitted_at is naive UTC, the same clock as summary_today()
+        if summary["day"] == submitted_at.date().isoformat():
+            summary["todays_kyc_count"] += len(entries)
+        for entry in reversed(entries[-TOP_KYC_LIMIT:]):
+            _push_top_kyc(summary, {
+                "kyc_id": entry["kyc_id"],
+                "name": entry.get("name"),
+                "changed_at": submitted_at.isoformat(),
+                "status": pending,
+            })
+        return summary
+
+    _safe_update(admin_id, apply)
+
+
+def record_status_change(kyc_id: int, old_admin_id: Optional[int], new_admin_id: Optional[int],
+                         old_status, new_status, changed_at: Optional[datetime] = None,
+                         name: Optional[str] = None, name_known: bool = False) -> None:
+    """
+    A KYC moved from `old_status` (owned by `old_admin_id`) to `new_status`
+    (owned by `new_admin_id`). Pass `changed_at` only when the status row's
+    changed_at was updated too. `name_known` says whether `name` is the
+    current KYC name (it may legitimately be None, e.g. after a re-KYC).
+    Call after the transaction has committed.
+    """
+    old_status, new_status = _status_value(old_status), _status_value(new_status)
+
+    def update_top(summary: dict) -> Optional[dict]:
+        existing = next((k for k in summary["top_kycs"] if k["kyc_id"] == kyc_id), None)
+        if changed_at is None:
+            # Order is unchanged; just refresh the status shown
+            if existing is not None:
+                existing["status"] = new_status
+                if name_known:
+                    existing["name"] = name
+            return summary
+        if not name_known and existing is None:
+            # Would need the name from the database - recompute instead
+            return None
+        return _push_top_kyc(summary, {
+            "kyc_id": kyc_id,
+            "name": name if name_known else existing["name"],
+            "changed_at": changed_at.isoformat(),
+            "status": new_status,
+        })
+
+    if old_admin_id == new_admin_id:
+        def apply(summary: dict) -> Optional[dict]:
+            counts = summary["counts"]
+            counts[old_status] = max(0, counts.get(old_status, 0) - 1)
+            counts[new_status] = counts.get(new_status, 0) + 1
+            return update_top(summary)
+
+        _safe_update(new_admin_id, apply)
+        return
+
+    def apply_old(summary: dict) -> Optional[dict]:
+        summary["counts"][old_status] = max(0, summary["counts"].get(old_status, 0) - 1)
+        if any(k["kyc_id"] == kyc_id for k in summary["top_kycs"]):
+            # Its replacement in the top list is unknown here
+            return None
+        return summary
+
+    def apply_new(summary: dict) -> Optional[dict]:
+        summary["counts"][new_status] = summary["counts"].get(new_status, 0) + 1
+        return update_top(summary)
+
+    _safe_update(old_admin_id, apply_old)
+    _safe_update(new_admin_id, apply_new)
+
+
+def summary_today() -> date:
+    """The day the "today" count refers to: the UTC date, like KYC.submitted_at."""
+    return datetime.utcnow().date()
+
+
+def build_summary(day: date, counts: dict, total_kyc_count: int, todays_kyc_count: int, top_kycs: list) -> dict:
+    return {
+        "day": day.isoformat(),
+        "counts": {_status_value(k): v for k, v in counts.items()},
+        "total_kyc_count": total_kyc_count,
+        "todays_kyc_count": todays_kyc_count,
+        "top_kycs": top_kycs,
+    }
@@ -0,0 +1,2 @@
+from .pool import *
+from .tasks import *
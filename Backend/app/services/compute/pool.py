@@ -0,0 +1,130 @@
+import os
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["ComputePool", "ComputePoolBusyError", "get_compute_pool", "shutdown_compute_pool"]
+
+COMPUTE_PROCESSES = int(os.getenv("COMPUTE_PROCESSES", str(min(2, os.cpu_count() or 1))))
+COMPUTE_MAX_PENDING = int(os.getenv("COMPUTE_MAX_PENDING", str(COMPUTE_PROCESSES * 4)))
+COMPUTE_ACQUIRE_TIMEOUT = float(os.getenv("COMPUTE_ACQUIRE_TIMEOUT", "10"))
+COMPUTE_TASK_TIMEOUT = float(os.getenv("COMPUTE_TASK_TIMEOUT", "120"))
+
+
+class ComputePoolBusyError(RuntimeError):
+    """
+    Every compute slot stayed taken for the whole acquire timeout. The app
+    answers it with a 503 and Retry-After of `retry_after` seconds.
+    """
+
+    retry_after = 5
+
+    def __init__(self):
+        super().__init__("Server is busy, please retry shortly")
+
+
+class ComputePool:
+    """
+    Bounded process pool for CPU-bound work (PDF rendering, image decoding,
+    parsing large uploads), so it runs outside the API process's GIL.
+
+    At most `max_pending` tasks are queued or running at once. Further
+    callers wait up to `acquire_timeout` for a slot and then get
+    ComputePoolBusyError (a 503 from the API), which sheds a burst of heavy work instead
+    of building an unbounded backlog that delays every other request.
+
+    Processes are spawned, not forked, because the API process runs threads.
+    A spawned process only has what importing the task's module sets up, so
+    task functions belong in light modules such as services.compute.tasks.
+    """
+
+    def __init__(self, processes: int = COMPUTE_PROCESSES, max_pending: int = COMPUTE_MAX_PENDING,
+                 acquire_timeout: float = COMPUTE_ACQUIRE_TIMEOUT, task_timeout: float = COMPUTE_TASK_TIMEOUT):
+        self.processes = max(1, processes)
+        self.max_pending = max(self.processes, max_pending)
+        self.acquire_timeout = acquire_timeout
+        self.task_timeout = task_timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                logger.info(f"Starting compute pool with {self.processes} processes")
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _reset_executor(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _submit_acquired(self, fn: Callable, args: tuple) -> Future:
+        """Submit with a slot already held; the slot is released when the task finishes."""
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # A render process died (e.g. out of memory) - start a fresh pool once
+                logger.warning("Compute pool was broken, restarting it")
+                self._reset_executor(executor)
+                future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Submit from sync code, blocking the calling thread while the pool is full."""
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise ComputePoolBusyError()
+        return self._submit_acquired(fn, args)
+
+    def run(self, fn: Callable, *args, timeout: Optional[float] = None):
+        """Run `fn(*args)` in the pool from sync code (e.g. a threadpool route) and return its result."""
+        return self.submit(fn, *args).result(timeout=timeout or self.task_timeout)
+
+    async def run_async(self, fn: Callable, *args, timeout: Optional[float] = None):
+        """Run `fn(*args)` in the pool without blocking the event loop while waiting for a slot or result."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.acquire_timeout
+        delay = 0.005
+        # Polling keeps cancellation safe: a slot is only ever taken by this coroutine itself
+        while not self._slots.acquire(blocking=False):
+            if loop.time() >= deadline:
+                raise ComputePoolBusyError()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+        future = self._submit_acquired(fn, args)
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout or self.task_timeout)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache()
+def get_compute_pool() -> ComputePool:
+    """Process-wide pool; sized by COMPUTE_PROCESSES and COMPUTE_MAX_PENDING."""
+    return ComputePool()
+
+
+def shutdown_compute_pool() -> None:
+    if get_compute_pool.cache_info().currsize:
+        get_compute_pool().shutdown()
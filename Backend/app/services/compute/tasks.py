@@ -0,0 +1,106 @@
+import csv
+import io
+import json
+import base64
+import hashlib
+from typing import List, Optional, Tuple
+from kyc_storage import (
+    get_blob_store, is_blob_ref, make_blob_ref, parse_blob_ref, decode_base64_image,
+    store_base64_image, make_thumbnail,
+)
+
+# Functions here run inside the compute pool's processes. Each one is
+# imported fresh by a spawned process, so this module stays free of the
+# database, FastAPI app and AI stack; keep heavy imports inside functions.
+
+__all__ = [
+    "clean_base64",
+    "render_pdf_document",
+    "decode_base64_with_digest",
+    "store_image",
+    "store_photo",
+    "store_thumbnail",
+    "parse_customer_rows",
+]
+
+CUSTOMER_COLUMNS = ("name", "email", "mobile_number")
+
+
+def clean_base64(data: Optional[str]) -> str:
+    if not data:
+        return ""
+    if "," in data:
+        return data.split(",", 1)[1]  # remove prefix like data:image/jpeg;base64,
+    return data
+
+
+def render_pdf_document(pdf_data: dict) -> bytes:
+    """WeasyPrint layout for one KYC."""
+    from kyc_pdf.pdf_service import DynamicPDF
+
+    return DynamicPDF().generate(pdf_data)
+
+
+def decode_base64_with_digest(value: str) -> Tuple[bytes, str]:
+    """Raw bytes and SHA-256 of a legacy inline base64 image."""
+    raw = base64.b64decode(clean_base64(value))
+    return raw, hashlib.sha256(raw).hexdigest()
+
+
+def store_image(value: Optional[str]) -> Optional[str]:
+    """Decode a base64 image into the blob store; only the reference goes back to the caller."""
+    return store_base64_image(value)
+
+
+def store_photo(value: str) -> Tuple[str, Optional[str]]:
+    """Store a base64 selfie and its thumbnail, decoding once. Returns both references."""
+    raw = decode_base64_image(value)
+    store = get_blob_store()
+    photo_ref = make_blob_ref(store.put(raw))
+    thumbnail = make_thumbnail(raw)
+    thumbnail_ref = make_blob_ref(store.put(thumbnail)) if thumbnail else None
+    return photo_ref, thumbnail_ref
+
+
+def store_thumbnail(photo_value: str) -> Optional[str]:
+    """Build and store the thumbnail of a photo given as a blob reference or base64."""
+    if is_blob_ref(photo_value):
+        raw = get_blob_store().read(parse_blob_ref(photo_value))
+    else:
+        raw = decode_base64_image(photo_value)
+    thumbnail = make_thumbnail(raw)
+    return make_blob_ref(get_blob_store().put(thumbnail)) if thumbnail else None
+
+
+def _customer_row(row) -> Tuple[str, str, str]:
+    if not isinstance(row, dict):
+        return ("", "", "")
+    return tuple(str(row.get(column) or "").strip() for column in CUSTOMER_COLUMNS)
+
+
+def parse_customer_rows(content: bytes, fmt: str) -> List[Tuple[str, str, str]]:
+    """
+    Parse a bulk initiation upload into (name, email, mobile_number) rows.
+    `fmt` is "json" (an object with a "customers" list) or "csv" (a header
+    row with the three columns). Raises ValueError for a malformed upload;
+    bad individual rows come back blank and fail validation later.
+    """
+    if fmt == "json":
+        try:
+            payload = json.loads(content)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ValueError(f"Invalid JSON body: {e}")
+        customers = payload.get("customers") if isinstance(payload, dict) else None
+        if not isinstance(customers, list):
+            raise ValueError("Body must be an object with a 'customers' list")
+        return [_customer_row(row) for row in customers]
+
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("CSV must be UTF-8 encoded")
+    reader = csv.DictReader(io.StringIO(text))
+    missing = set(CUSTOMER_COLUMNS) - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(sorted(missing))}")
+    return [_customer_row(row) for row in reader]
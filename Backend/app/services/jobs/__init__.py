@@ -0,0 +1,2 @@
+from .manager import *
+from .handlers import *
@@ -0,0 +1,61 @@
+import os
+import asyncio
+import logging
+from kyc_db import async_session_maker, db, KYC, KYCStatusLog, KYCStatus
+from kyc_storage import load_base64_image
+from .manager import register_job_handler, enqueue_job_async
+
+logger = logging.getLogger(__name__)
+
+KYRA_MATCH_JOB = "kyra_match"
+TAMPER_REVIEW_JOB = "tamper_review"
+PDF_RENDER_JOB = "pdf_render"
+
+
+@register_job_handler(KYRA_MATCH_JOB)
+async def run_kyra_match(kyc_id: int):
+    # Imported here so the worker can be started without pulling the AI stack in at import time
+    from services.user import kyra_match_agent_bg
+
+    async with async_session_maker() as session:
+        kyc = await session.get(KYC, kyc_id)
+        status_log = await session.get(KYCStatusLog, kyc_id)
+    if kyc is None or status_log is None:
+        logger.warning(f"KYC ID {kyc_id} no longer exists, skipping Kyra match")
+        return
+    # A retry after the review was saved (or after an admin decided) must not
+    # re-run the agent or mail the customer again. The submission is
+    # identified by the changed_at submit_user wrote to the status row.
+    review_key = status_log.changed_at.isoformat() if status_log.changed_at else None
+    if status_log.status != KYCStatus.UNDER_REVIEW or (kyc.ai_notes or {}).get("reviewKey") == review_key:
+        logger.info(f"Kyra review for KYC ID {kyc_id} already done, skipping")
+    else:
+        # SMTP credentials come from the environment, never from the stored payload
+        await kyra_match_agent_bg(
+            kyc_id,
+            kyc,
+            os.getenv("SMTP_SERVER"),
+            int(os.getenv("SMTP_PORT")),
+            os.getenv("SMTP_SENDER_EMAIL"),
+            os.getenv("SMTP_SENDER_PASSWORD"),
+            review_key=review_key,
+        )
+    # Render the PDF from the merged KYC.data; a no-op if it is already current
+    async with async_session_maker() as session:
+        await enqueue_job_async(session, PDF_RENDER_JOB, {"kyc_id": kyc_id})
+
+
+@register_job_handler(TAMPER_REVIEW_JOB)
+async def run_tamper_review(kyc_id: int, result: dict, image_ref: str):
+    from services.ai.manager import bg_tamper_review_generation
+
+    base_64 = await asyncio.to_thread(load_base64_image, image_ref, None, False)
+    await bg_tamper_review_generation(result, kyc_id, base_64)
+
+
+@register_job_handler(PDF_RENDER_JOB)
+async def run_pdf_render(kyc_id: int):
+    from services.user import prerender_kyc_pdf
+
+    with db.get_session() as session:
+        await prerender_kyc_pdf(kyc_id, session)
@@ -0,0 +1,186 @@
+import os
+import socket
+import random
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+from sqlalchemy import and_, or_, update
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from kyc_db import async_session_maker, BackgroundJob, JobStatus
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKER_ENABLED = os.getenv("JOB_WORKER_ENABLED", "true").lower() == "true"
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "600"))
+# A RUNNING job whose lock is older than this is assumed lost (worker died) and is picked up again
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", str(JOB_TIMEOUT + 60)))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "900"))
+
+JobHandler = Callable[..., Awaitable[None]]
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def register_job_handler(job_type: str):
+    """Decorator registering an async handler; it is called with the job payload as keyword arguments."""
+    def decorator(func: JobHandler) -> JobHandler:
+        JOB_HANDLERS[job_type] = func
+        return func
+    return decorator
+
+
+def enqueue_job(db: Session, job_type: str, payload: dict, max_attempts: int = 5, commit: bool = True) -> int:
+    """
+    Insert a job from sync request code and commit. Returns the job id.
+    With commit=False the job is only flushed, so it lands in the caller's commit.
+    """
+    job = BackgroundJob(job_type=job_type, payload=payload, max_attempts=max_attempts, status=JobStatus.QUEUED)
+    db.add(job)
+    if commit:
+        db.commit()
+    else:
+        db.flush()
+    return job.job_id
+
+
+async def enqueue_job_async(session: AsyncSession, job_type: str, payload: dict, max_attempts: int = 5) -> int:
+    """Insert a job from async code and commit. Returns the job id."""
+    job = BackgroundJob(job_type=job_type, payload=payload, max_attempts=max_attempts, status=JobStatus.QUEUED)
+    session.add(job)
+    await session.commit()
+    return job.job_id
+
+
+def get_job(db: Session, job_id: int) -> Optional[BackgroundJob]:
+    return db.scalar(select(BackgroundJob).where(BackgroundJob.job_id == job_id))
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter: base * 2^(attempts-1), capped."""
+    delay = min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class JobWorker:
+    """
+    Polls the background_jobs table and runs registered handlers. Each of the
+    `concurrency` loops claims one job at a time with SELECT ... FOR UPDATE
+    SKIP LOCKED, so any number of workers across processes can share the
+    table without double-processing a job.
+    """
+
+    def __init__(self, concurrency: int = JOB_WORKER_CONCURRENCY, poll_interval: float = JOB_POLL_INTERVAL):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks = []
+        self._stopping = asyncio.Event()
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._stopping.clear()
+        self._tasks = [asyncio.create_task(self._run_loop(i)) for i in range(self.concurrency)]
+        logger.info(f"Job worker {self.worker_id} started with concurrency {self.concurrency}")
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run_loop(self, slot: int) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = await self._claim_job()
+                if job is None:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                await self._execute(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker slot {slot} error: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _claim_job(self) -> Optional[BackgroundJob]:
+        while True:
+            now = datetime.now(timezone.utc)
+            lease_expired = now - timedelta(seconds=JOB_LEASE_SECONDS)
+            async with async_session_maker() as session:
+                async with session.begin():
+                    job = (await session.execute(
+                        select(BackgroundJob)
+                        .where(
+                            or_(
+                                and_(BackgroundJob.status == JobStatus.QUEUED, BackgroundJob.run_after <= now),
+                                and_(BackgroundJob.status == JobStatus.RUNNING, BackgroundJob.locked_at < lease_expired),
+                            )
+                        )
+                        .order_by(BackgroundJob.run_after)
+                        .limit(1)
+                        .with_for_update(skip_locked=True)
+                    )).scalar_one_or_none()
+                    if job is None:
+                        return None
+                    if job.status == JobStatus.RUNNING and job.attempts >= job.max_attempts:
+                        # Its worker died or hung on the last allowed attempt - don't run it again
+                        job.status = JobStatus.FAILED
+                        job.last_error = f"Lease held by {job.locked_by} expired on attempt {job.attempts}"
+                        job.locked_at = None
+                        job.locked_by = None
+                        logger.error(f"Job {job.job_id} ({job.job_type}) failed permanently: {job.last_error}")
+                        continue
+                    job.status = JobStatus.RUNNING
+                    job.attempts += 1
+                    job.locked_at = now
+                    job.locked_by = self.worker_id
+                return job
+
+    async def _execute(self, job: BackgroundJob) -> None:
+        handler = JOB_HANDLERS.get(job.job_type)
+        try:
+            if handler is None:
+                raise RuntimeError(f"No handler registered for job type '{job.job_type}'")
+            await asyncio.wait_for(handler(**(job.payload or {})), timeout=JOB_TIMEOUT)
+        except asyncio.CancelledError:
+            # Shutting down - the lease expires and another worker retries it
+            raise
+        except Exception as e:
+            await self._mark_failed(job, e)
+            return
+        await self._finish(job.job_id, status=JobStatus.SUCCEEDED, last_error=None)
+        logger.info(f"Job {job.job_id} ({job.job_type}) succeeded")
+
+    async def _mark_failed(self, job: BackgroundJob, error: Exception) -> None:
+        message = f"{type(error).__name__}: {error}"
+        if job.attempts < job.max_attempts:
+            delay = retry_delay(job.attempts)
+            logger.warning(f"Job {job.job_id} ({job.job_type}) attempt {job.attempts} failed, retrying in {delay:.0f}s: {message}")
+            await self._finish(
+                job.job_id,
+                status=JobStatus.QUEUED,
+                last_error=message,
+                run_after=datetime.now(timezone.utc) + timedelta(seconds=delay),
+            )
+        else:
+            logger.error(f"Job {job.job_id} ({job.job_type}) failed permanently: {message}")
+            await self._finish(job.job_id, status=JobStatus.FAILED, last_error=message)
+
+    async def _finish(self, job_id: int, **values) -> None:
+        async with async_session_maker() as session:
+            await session.execute(
+                update(BackgroundJob)
+                .where(BackgroundJob.job_id == job_id)
+                .values(locked_at=None, locked_by=None, **values)
+            )
+            await session.commit()
+
+
+job_worker = JobWorker()
@@ -0,0 +1,2 @@
+from .index import *
+from .binary import *
\ No newline at end of file
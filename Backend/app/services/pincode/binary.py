@@ -0,0 +1,151 @@
+import os
+import sys
+import mmap
+import struct
+import bisect
+import logging
+from array import array
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from .index import PincodeIndex
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["MmapPincodeIndex", "compile_pincode_index", "load_pincode_index"]
+
+# File layout (native byte order, recorded in the header):
+#   header   | magic, byteorder, count, n_locations, n_strings, source size, source mtime_ns
+#   pins     | count x u32, sorted ascending
+#   loc_ids  | count x u32, location id for each pin
+#   locs     | n_locations x (u32 district string id, u32 state string id)
+#   str_offs | (n_strings + 1) x u32 offsets into the string data
+#   strings  | utf-8 bytes
+_MAGIC = b"PINIDX01"
+_HEADER = struct.Struct("=8s1s3xIIIqq")
+
+
+def _source_stat(csv_path: str) -> Tuple[int, int]:
+    st = os.stat(csv_path)
+    return st.st_size, st.st_mtime_ns
+
+
+def compile_pincode_index(csv_path: str, out_path: str) -> int:
+    """Compile the pincode CSV into the binary format. Returns the number of pincodes."""
+    index = PincodeIndex.from_csv(csv_path)
+    pins = sorted(index._by_pin)
+
+    strings: List[str] = []
+    string_ids = {}
+
+    def string_id(value: str) -> int:
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    locs = array("I")
+    for district, state in index._locations:
+        locs.append(string_id(district))
+        locs.append(string_id(state))
+
+    string_data = bytearray()
+    str_offs = array("I", [0])
+    for value in strings:
+        string_data += value.encode("utf-8")
+        str_offs.append(len(string_data))
+
+    source_size, source_mtime = _source_stat(csv_path)
+    header = _HEADER.pack(
+        _MAGIC, sys.byteorder[0].encode(), len(pins), len(index._locations), len(strings),
+        source_size, source_mtime,
+    )
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(header)
+        fh.write(array("I", pins).tobytes())
+        fh.write(array("I", (index._by_pin[p] for p in pins)).tobytes())
+        fh.write(locs.tobytes())
+        fh.write(str_offs.tobytes())
+        fh.write(string_data)
+    os.replace(tmp_path, out_path)
+    return len(pins)
+
+
+class MmapPincodeIndex:
+    """
+    Read-only pincode index backed by a memory-mapped compiled file. Pages
+    are shared between all workers through the OS page cache, and nothing is
+    parsed up front: lookups bisect the sorted pin array in place.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as fh:
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        magic, byteorder, count, n_locations, n_strings, self.source_size, self.source_mtime = \
+            _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or byteorder != sys.byteorder[0].encode():
+            raise ValueError(f"Incompatible pincode index file: {path}")
+
+        offset = _HEADER.size
+        self._pins = view[offset:offset + count * 4].cast("I")
+        offset += count * 4
+        self._loc_ids = view[offset:offset + count * 4].cast("I")
+        offset += count * 4
+        self._locs = view[offset:offset + n_locations * 8].cast("I")
+        offset += n_locations * 8
+        self._str_offs = view[offset:offset + (n_strings + 1) * 4].cast("I")
+        offset += (n_strings + 1) * 4
+        self._strings = view[offset:]
+
+    def is_stale(self, csv_path: str) -> bool:
+        try:
+            return (self.source_size, self.source_mtime) != _source_stat(csv_path)
+        except FileNotFoundError:
+            # No CSV to compare against - the compiled file is all we have
+            return False
+
+    @lru_cache(maxsize=4096)
+    def _string(self, string_id: int) -> str:
+        start, end = self._str_offs[string_id], self._str_offs[string_id + 1]
+        return sys.intern(bytes(self._strings[start:end]).decode("utf-8"))
+
+    def lookup(self, pincode: int) -> Optional[Tuple[str, str]]:
+        """Return (district, state) for a pincode, or None."""
+        i = bisect.bisect_left(self._pins, pincode)
+        if i == len(self._pins) or self._pins[i] != pincode:
+            return None
+        location_id = self._loc_ids[i]
+        return self._string(self._locs[2 * location_id]), self._string(self._locs[2 * location_id + 1])
+
+    def __len__(self) -> int:
+        return len(self._pins)
+
+
+def load_pincode_index(csv_path: str, bin_path: Optional[str] = None):
+    """
+    Open the compiled index, (re)compiling it when missing or older than the
+    CSV. Falls back to building the index in memory from the CSV when the
+    compiled file cannot be written (e.g. read-only filesystem).
+    """
+    bin_path = bin_path or os.path.splitext(csv_path)[0] + ".bin"
+
+    if os.path.exists(bin_path):
+        try:
+            index = MmapPincodeIndex(bin_path)
+            if not index.is_stale(csv_path):
+                return index
+            logger.info(f"Compiled pincode index {bin_path} is stale, recompiling")
+        except Exception as e:
+            logger.warning(f"Failed to open compiled pincode index {bin_path}: {e}")
+
+    try:
+        compile_pincode_index(csv_path, bin_path)
+        return MmapPincodeIndex(bin_path)
+    except OSError as e:
+        logger.warning(f"Could not compile pincode index to {bin_path}, using CSV: {e}")
+        return PincodeIndex.from_csv(csv_path)
@@ -0,0 +1,26 @@
+"""
+Build step: compile Pincode.csv into the memory-mappable binary index.
+
+    python -m services.pincode.compile [csv_path] [out_path]
+"""
+import os
+import sys
+import time
+
+from .binary import compile_pincode_index
+
+DEFAULT_CSV_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "Pincode.csv"))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    csv_path = argv[0] if argv else os.getenv("PIN_CSV_PATH", DEFAULT_CSV_PATH)
+    out_path = argv[1] if len(argv) > 1 else os.getenv("PIN_INDEX_PATH", os.path.splitext(csv_path)[0] + ".bin")
+
+    start = time.time()
+    count = compile_pincode_index(csv_path, out_path)
+    print(f"Compiled {count} pincodes from {csv_path} to {out_path} in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
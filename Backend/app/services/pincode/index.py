@@ -0,0 +1,60 @@
+import csv
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+__all__ = ["PincodeIndex"]
+
+
+class PincodeIndex:
+    """
+    Compact in-memory pincode lookup. Each pincode maps to a small integer
+    location id; distinct (district, state) pairs are stored once with
+    interned strings, since thousands of pincodes share the same district.
+    """
+
+    def __init__(self):
+        self._by_pin: Dict[int, int] = {}
+        self._locations: List[Tuple[str, str]] = []
+        self._location_ids: Dict[Tuple[str, str], int] = {}
+
+    def add(self, pincode: int, district: str, state: str) -> None:
+        # The CSV has one row per post office; the first row for a pincode wins
+        if pincode in self._by_pin:
+            return
+        location = (sys.intern(district), sys.intern(state))
+        location_id = self._location_ids.get(location)
+        if location_id is None:
+            location_id = len(self._locations)
+            self._locations.append(location)
+            self._location_ids[location] = location_id
+        self._by_pin[pincode] = location_id
+
+    def lookup(self, pincode: int) -> Optional[Tuple[str, str]]:
+        """Return (district, state) for a pincode, or None."""
+        location_id = self._by_pin.get(pincode)
+        if location_id is None:
+            return None
+        return self._locations[location_id]
+
+    def __len__(self) -> int:
+        return len(self._by_pin)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, str, str]]) -> "PincodeIndex":
+        index = cls()
+        for pincode, district, state in rows:
+            pincode = (pincode or "").strip()
+            if not pincode.isdigit():
+                continue
+            index.add(int(pincode), (district or "").strip(), (state or "").strip())
+        return index
+
+    @classmethod
+    def from_csv(cls, csv_path: str, encoding: str = "latin1") -> "PincodeIndex":
+        """Build the index from the India post office CSV (Pincode, District, StateName columns)."""
+        with open(csv_path, newline="", encoding=encoding) as fh:
+            reader = csv.DictReader(fh)
+            return cls.from_rows(
+                (row.get("Pincode"), row.get("District"), row.get("StateName"))
+                for row in reader
+            )
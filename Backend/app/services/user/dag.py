@@ -0,0 +1,68 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["DagStep", "run_dag"]
+
+
+@dataclass
+class DagStep:
+    """
+    One node of a review pipeline. `func` is awaited with the results of
+    `deps` passed as keyword arguments named after the dependency steps.
+    """
+    name: str
+    func: Callable[..., Awaitable[Any]]
+    deps: Sequence[str] = field(default_factory=tuple)
+
+
+def _topological_order(steps: List[DagStep]) -> List[DagStep]:
+    by_name = {step.name: step for step in steps}
+    if len(by_name) != len(steps):
+        raise ValueError("Duplicate step names in DAG")
+    ordered, state = [], {}
+
+    def visit(step: DagStep):
+        if state.get(step.name) == "done":
+            return
+        if state.get(step.name) == "visiting":
+            raise ValueError(f"Cycle in DAG at step '{step.name}'")
+        state[step.name] = "visiting"
+        for dep in step.deps:
+            if dep not in by_name:
+                raise ValueError(f"Step '{step.name}' depends on unknown step '{dep}'")
+            visit(by_name[dep])
+        state[step.name] = "done"
+        ordered.append(step)
+
+    for step in steps:
+        visit(step)
+    return ordered
+
+
+async def run_dag(steps: List[DagStep], timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Run every step as soon as its dependencies have finished, so independent
+    branches overlap. Returns {step name: result}. The first failure, or
+    running past `timeout` seconds, cancels all unfinished steps and raises.
+    """
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run_step(step: DagStep):
+        dep_results = await asyncio.gather(*(tasks[dep] for dep in step.deps))
+        return await step.func(**dict(zip(step.deps, dep_results)))
+
+    for step in _topological_order(steps):
+        tasks[step.name] = asyncio.create_task(run_step(step), name=step.name)
+
+    try:
+        results = await asyncio.wait_for(asyncio.gather(*tasks.values()), timeout=timeout)
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    return dict(zip(tasks.keys(), results))
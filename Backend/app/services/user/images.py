@@ -0,0 +1,205 @@
+import os
+import copy
+from functools import lru_cache
+from typing import BinaryIO, List, Optional, Tuple
+import logging
+from kyc_storage import (
+    get_blob_store, is_blob_ref, make_blob_ref, parse_blob_ref, load_base64_image,
+    guess_content_type, BlobNotFoundError, DEFAULT_CHUNK_SIZE,
+)
+from services.compute import get_compute_pool, store_image, store_photo, store_thumbnail
+
+logger = logging.getLogger(__name__)
+
+MAX_IMAGE_UPLOAD_BYTES = int(os.getenv("MAX_IMAGE_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_IMAGE_TYPES = ("image/jpeg", "image/png", "image/gif", "image/webp")
+
+
+class ImageTooLargeError(ValueError):
+    pass
+
+
+class InvalidImageError(ValueError):
+    """A client-sent image that is not valid base64 or references no stored blob."""
+
+# Public image name -> location of the image inside KYC.data
+KYC_IMAGE_FIELDS = {
+    "photo": ("photoImage",),
+    "liveness": ("livenessImage",),
+    "permanent-ovd": ("permanentAddressDocuments", "ovdImage"),
+    "corporate-ovd": ("corporateAddressDocuments", "ovdImage"),
+}
+
+
+def _get_path(data: dict, path: Tuple[str, ...]):
+    value = data
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _set_path(data: dict, path: Tuple[str, ...], value) -> None:
+    for key in path[:-1]:
+        data = data.get(key)
+        if not isinstance(data, dict):
+            return
+    if path[-1] in data:
+        data[path[-1]] = value
+
+
+def check_blob_ref(value: str) -> str:
+    """A blob reference sent by a client must point at a blob that is already stored."""
+    try:
+        exists = get_blob_store().exists(parse_blob_ref(value))
+    except ValueError:
+        exists = False
+    if not exists:
+        raise InvalidImageError(f"Unknown image reference: {value}")
+    return value
+
+
+def offload_image(value: Optional[str]) -> Optional[str]:
+    """
+    Move a base64 image into the blob store and return the reference kept in
+    KYC.data. Raises InvalidImageError for malformed base64 or an unknown reference.
+    """
+    return offload_images(value)[0]
+
+
+def offload_images(*values: Optional[str]) -> List[Optional[str]]:
+    """offload_image for several images at once; they are decoded in parallel."""
+    pool = get_compute_pool()
+    # Decoding megabytes of base64 holds the GIL, so it happens in the compute pool
+    futures = [pool.submit(store_image, value) if value and not is_blob_ref(value) else None for value in values]
+    refs = []
+    for value, future in zip(values, futures):
+        if future is None:
+            refs.append(check_blob_ref(value) if value else value)
+            continue
+        try:
+            refs.append(future.result(timeout=pool.task_timeout))
+        except ValueError as e:
+            raise InvalidImageError(str(e))
+    return refs
+
+
+def store_image_upload(fileobj: BinaryIO, content_type: Optional[str] = None,
+                       max_bytes: int = MAX_IMAGE_UPLOAD_BYTES) -> Optional[str]:
+    """
+    Stream an uploaded image file into the blob store chunk by chunk and return
+    its reference, or None for an empty upload. Raises InvalidImageError unless
+    the file is a JPEG, PNG, GIF or WebP image (nothing is stored then), and
+    ImageTooLargeError past `max_bytes` (the partial upload is discarded).
+    """
+    if content_type and not content_type.startswith("image/") and content_type != "application/octet-stream":
+        raise InvalidImageError(f"Unsupported image type: {content_type}")
+    head = fileobj.read(DEFAULT_CHUNK_SIZE)
+    if not head:
+        return None
+    # The declared type is the client's word; the leading bytes decide
+    sniffed = guess_content_type(head[:16])
+    if sniffed not in UPLOAD_IMAGE_TYPES:
+        raise InvalidImageError(f"Uploaded file is not a supported image ({sniffed})")
+    size = 0
+
+    def chunks():
+        nonlocal size
+        chunk = head
+        while chunk:
+            size += len(chunk)
+            if size > max_bytes:
+                raise ImageTooLargeError(f"Image exceeds {max_bytes} bytes")
+            yield chunk
+            chunk = fileobj.read(DEFAULT_CHUNK_SIZE)
+
+    return make_blob_ref(get_blob_store().put_stream(chunks()))
+
+
+def offload_photo(value: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Store the selfie and its dashboard thumbnail, decoding the base64 only once.
+    A value that is already a blob reference (multipart upload) only gets its
+    thumbnail built. Returns (photo reference, thumbnail reference or None).
+    """
+    if not value:
+        return value, None
+    if is_blob_ref(value):
+        return check_blob_ref(value), build_thumbnail_ref(value)
+    try:
+        return get_compute_pool().run(store_photo, value)
+    except ValueError as e:
+        raise InvalidImageError(str(e))
+
+
+def build_thumbnail_ref(photo_value: Optional[str]) -> Optional[str]:
+    """Generate a thumbnail for a photo saved before thumbnails existed."""
+    if not photo_value:
+        return None
+    if is_blob_ref(photo_value):
+        return _blob_thumbnail_ref(photo_value)
+    return get_compute_pool().run(store_thumbnail, photo_value)
+
+
+@lru_cache(maxsize=2048)
+def _blob_thumbnail_ref(photo_ref: str) -> Optional[str]:
+    # The photo is content-addressed, so its thumbnail never changes
+    return get_compute_pool().run(store_thumbnail, photo_ref)
+
+
+@lru_cache(maxsize=2048)
+def read_thumbnail(digest: str) -> bytes:
+    """Thumbnails are a few KB and content-addressed, so they can be cached forever."""
+    return get_blob_store().read(digest)
+
+
+def hydrate_kyc_images(data: Optional[dict]) -> dict:
+    """
+    Return a copy of KYC.data with every blob reference resolved back to a
+    base64 data URI, for responses that still embed images inline.
+    """
+    if not data:
+        return {}
+    hydrated = copy.deepcopy(data)
+    for path in KYC_IMAGE_FIELDS.values():
+        value = _get_path(hydrated, path)
+        if is_blob_ref(value):
+            try:
+                _set_path(hydrated, path, load_base64_image(value))
+            except BlobNotFoundError:
+                # A dangling reference must not break every read of the KYC
+                logger.warning(f"Image blob missing for {value}")
+                _set_path(hydrated, path, None)
+    return hydrated
+
+
+def resolve_image_base64(value: Optional[str]) -> str:
+    """Bare base64 for an image value that may be a blob reference (used by AI calls)."""
+    value = load_base64_image(value, as_data_uri=False) or ""
+    if "," in value:
+        value = value.split(",", 1)[1]  # legacy inline value with data:image/...;base64, prefix
+    return value
+
+
+def image_url(kyc_id: int, image_name: str, value: Optional[str]) -> Optional[str]:
+    """Link to the image endpoint; blob-backed images get a digest-versioned, immutable URL."""
+    if is_blob_ref(value):
+        return f"/api/user/kyc/{kyc_id}/images/{image_name}?v={parse_blob_ref(value)[:16]}"
+    if value:
+        # Legacy inline base64 - served from the row on request
+        return f"/api/user/kyc/{kyc_id}/images/{image_name}"
+    return None
+
+
+def get_kyc_image_ref(data: Optional[dict], image_name: str) -> Optional[str]:
+    """Return the stored value (blob reference or legacy base64) for a named image."""
+    path = KYC_IMAGE_FIELDS.get(image_name)
+    if not path or not data:
+        return None
+    return _get_path(data, path)
+
+
+def get_kyc_image_digest(data: Optional[dict], image_name: str) -> Optional[str]:
+    value = get_kyc_image_ref(data, image_name)
+    return parse_blob_ref(value) if is_blob_ref(value) else None
@@ -1,3 +1,6 @@
+import os
+import re
+import time
 import asyncio
 import logging
 from typing import Optional
@@ -6,81 +9,112 @@ from models.user import PersonalInfo
 from sqlalchemy import cast, update
 from sqlalchemy.dialects.postgresql import JSONB
 from kyc_db import KYCStatus
-from kyc_client import KYCClient
+from kyc_client import get_kyc_client_pool
 from models.user.user_info import dict_to_dataclass, UserData
-from kyc_pdf.pdf_service import DynamicPDF
+from services.compute import get_compute_pool, render_pdf_document, decode_base64_with_digest
 from dataclasses import asdict
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from kyc_db import async_session_maker
 from openai import AsyncOpenAI
 from services.ai import generate_kyc_match_review, generate_liveness_review, generate_risk_score, is_all_confidence_high
-from kyc_email_sender import EmailManager
+from kyc_email_sender import EmailManager, get_mail_dispatcher
+from services.jobs import enqueue_job, KYRA_MATCH_JOB
+from services.admin.summary_cache import record_status_change
+from kyc_storage import get_blob_store, guess_content_type, is_blob_ref, parse_blob_ref, BlobNotFoundError, DEFAULT_CHUNK_SIZE
+from .dag import DagStep, run_dag
+from .pdf_cache import open_stored_pdf, store_kyc_pdf
+from .images import image_url, offload_image, offload_images, offload_photo, build_thumbnail_ref, read_thumbnail, hydrate_kyc_images, resolve_image_base64, get_kyc_image_ref, get_kyc_image_digest
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
 )
 logger = logging.getLogger(__name__)
 
-def _clean_base64(data: Optional[str]) -> str:
-    if not data:
-        return ""
-    if "," in data:
-        return data.split(",", 1)[1]  # remove prefix like data:image/jpeg;base64,
-    return data
+# Per-KYC time budget for the whole Kyra review, kept below the job timeout so the job can retry
+KYRA_REVIEW_TIMEOUT = float(os.getenv("KYRA_REVIEW_TIMEOUT", "300"))
+PDF_RENDER_TIMEOUT = float(os.getenv("PDF_RENDER_TIMEOUT", "120"))
+
+def kyc_accepts_changes(kyc_id: int, db) -> bool:
+    """
+    Unlocked status pre-check for the steps that store images, so nothing is
+    written to the blob store for a KYC that can no longer change. The locked
+    check in each step stays authoritative.
+    """
+    status = get_kyc_status(kyc_id, db)
+    # Don't keep a transaction open while the images are stored
+    db.rollback()
+    return status == KYCStatus.PENDING.value
 
 def add_personal_info(kyc_id: int, personal_info: PersonalInfo,db):
-    user_status = get_kyc_status_log(kyc_id,db)
+    if not kyc_accepts_changes(kyc_id, db):
+        print("Cannot add personal info. KYC is not in PENDING status.")
+        return None
+    # Images are stored before the rows are locked; the pool may make us wait
+    photo_ref, thumbnail_ref = offload_photo(personal_info.photoImage)
+    user_status = lock_kyc_status(kyc_id, db)
     print("User Status:", user_status)
     if user_status and user_status.status == KYCStatus.PENDING.value:
-        user_data = get_user_manager(kyc_id,db)
-        user_data.data['name'] = personal_info.name
-        user_data.data['gender'] = personal_info.gender
         dob_obj = datetime.strptime(personal_info.dob, "%Y-%m-%d")
-        user_data.data['dob'] = dob_obj.strftime("%d/%m/%Y")
-        user_data.data['emailId'] = personal_info.emailId
-        user_data.data['mobileNo'] = personal_info.mobileNo
-        user_data.data['fatherName'] = personal_info.fatherName
-        user_data.data['photoImage'] = personal_info.photoImage
-        user = update_user_manager(kyc_id, user_data,db)
+        changes = {
+            'name': personal_info.name,
+            'gender': personal_info.gender,
+            'dob': dob_obj.strftime("%d/%m/%Y"),
+            'emailId': personal_info.emailId,
+            'mobileNo': personal_info.mobileNo,
+            'fatherName': personal_info.fatherName,
+            'photoImage': photo_ref,
+            'photoThumbnail': thumbnail_ref,
+        }
+        user = patch_kyc_data(kyc_id, changes, db)
+        user.kyc_status = user_status.status
         return user
     else:
+        # Release the row lock
+        db.rollback()
         print(F"User Status Invalid:", user_status)
         print("Cannot add personal info. KYC is not in PENDING status.")
         return None
     
 def add_address_info(kyc_id: int, address_info,db):
-    user_status = get_kyc_status_log(kyc_id,db)
+    user_status = lock_kyc_status(kyc_id, db)
     print("User Status:", user_status)
     if user_status and user_status.status == KYCStatus.PENDING.value:
-        user_data = get_user_manager(kyc_id,db)
-        user_data.data['permanentAddress'] = address_info.permanentAddress.to_dict()
-        user_data.data['corporateAddress'] = address_info.corporateAddress.to_dict()
-        user = update_user_manager(kyc_id, user_data,db)
+        changes = {
+            'permanentAddress': address_info.permanentAddress.to_dict(),
+            'corporateAddress': address_info.corporateAddress.to_dict(),
+        }
+        user = patch_kyc_data(kyc_id, changes, db)
+        user.kyc_status = user_status.status
         return user
     else:
+        # Release the row lock
+        db.rollback()
         print(F"User Status Invalid:", user_status)
         print("Cannot add address info. KYC is not in PENDING status.")
         return None
     
 def add_documents_info(kyc_id: int, documents_info,db):
-    user_status = get_kyc_status_log(kyc_id,db)
+    if not kyc_accepts_changes(kyc_id, db):
+        print("Cannot add documents info. KYC is not in PENDING status.")
+        return None
+    per_doc = documents_info.permanentAddressDocuments.to_dict()
+    corp_doc = documents_info.corporateAddressDocuments.to_dict()
+    # Images are stored before the rows are locked; the pool may make us wait
+    per_doc['ovdImage'], corp_doc['ovdImage'] = offload_images(per_doc.get('ovdImage'), corp_doc.get('ovdImage'))
+    user_status = lock_kyc_status(kyc_id, db)
     print("User Status:", user_status)
     if user_status and user_status.status == KYCStatus.PENDING.value:
-        user_data = get_user_manager(kyc_id,db)
-        # user_data.data['permanentAddressDocuments'] = documents_info.permanentAddressDocuments.to_dict()
-        # user_data.data['corporateAddressDocuments'] = documents_info.corporateAddressDocuments.to_dict()
-        per_doc = documents_info.permanentAddressDocuments.to_dict()
-        corp_doc = documents_info.corporateAddressDocuments.to_dict()
-        per_doc = per_doc
-        corp_doc = corp_doc
-        
-        user_data.data['permanentAddressDocuments'] = per_doc
-        user_data.data['corporateAddressDocuments'] = corp_doc
-        
-        user = update_user_manager(kyc_id, user_data,db)
+        changes = {
+            'permanentAddressDocuments': per_doc,
+            'corporateAddressDocuments': corp_doc,
+        }
+        user = patch_kyc_data(kyc_id, changes, db)
+        user.kyc_status = user_status.status
         return user
     else:
+        # Release the row lock
+        db.rollback()
         print(F"User Status Invalid:", user_status)
         print("Cannot add documents info. KYC is not in PENDING status.")
         return None
@@ -96,16 +130,25 @@ OVD_TYPE_MAP = {
     "VoterCard": "VoterCardRegular"
 }
 def add_liveness_info(kyc_id: int, liveness_info,db):
-    user_status = get_kyc_status_log(kyc_id,db)
+    if not kyc_accepts_changes(kyc_id, db):
+        print("Cannot add liveness info. KYC is not in PENDING status.")
+        return None
+    # Images are stored before the rows are locked; the pool may make us wait
+    liveness_ref = offload_image(liveness_info.livenessImage)
+    user_status = lock_kyc_status(kyc_id, db)
     print("User Status:", user_status)
     if user_status and user_status.status == KYCStatus.PENDING.value:
-        user_data = get_user_manager(kyc_id,db)
-        user_data.data['livenessStatus'] = liveness_info.livenessStatus
-        user_data.data['livenessScore'] = liveness_info.livenessScore
-        user_data.data['livenessImage'] = liveness_info.livenessImage
-        user = update_user_manager(kyc_id, user_data,db)
+        changes = {
+            'livenessStatus': liveness_info.livenessStatus,
+            'livenessScore': liveness_info.livenessScore,
+            'livenessImage': liveness_ref,
+        }
+        user = patch_kyc_data(kyc_id, changes, db)
+        user.kyc_status = user_status.status
         return user
     else:
+        # Release the row lock
+        db.rollback()
         print(F"User Status Invalid:", user_status)
         print("Cannot add liveness info. KYC is not in PENDING status.")
         return None
@@ -115,22 +158,126 @@ def get_kyc_details(kyc_id: int,db):
     user_data = get_user_manager(kyc_id,db)
     return user_data
 
-def generate_kyc_pdf(kyc_id: int, db_session):
-    user_status = get_kyc_status_log(kyc_id,db_session)
-    print("User Status:", user_status)
-    if user_status and user_status.status == KYCStatus.PENDING.value:
-        print("KYC is in PENDING status. Cannot generate PDF.")
+def serialize_kyc_details(user_data):
+    """Response view of a KYC row with stored image references resolved to base64."""
+    if not user_data:
         return None
-    
-    kyc_obj = db_session.query(KYC).filter(KYC.kyc_id == kyc_id).first()
-    
-    if not kyc_obj:
-        raise HTTPException(status_code=404, detail="KYC ID not found")
-    
-    data = kyc_obj.data
+    return {
+        "kyc_id": user_data.kyc_id,
+        "user_id": user_data.user_id,
+        "kyc_email": user_data.kyc_email,
+        "kyc_mobile": user_data.kyc_mobile,
+        "data": hydrate_kyc_images(user_data.data),
+        "ai_notes": user_data.ai_notes,
+        "submitted_at": user_data.submitted_at,
+        "kyc_status": getattr(user_data, "kyc_status", None),
+    }
 
+# Everything the wizard needs to re-render its steps; images are linked, not embedded
+KYC_SUMMARY_FIELDS = (
+    "name", "gender", "dob", "emailId", "mobileNo", "fatherName",
+    "permanentAddress", "corporateAddress",
+    "permanentAddressDocuments", "corporateAddressDocuments",
+    "livenessStatus", "livenessScore",
+)
+MAX_PROJECTION_FIELDS = 50
+_FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+def parse_kyc_fields(fields: Optional[str], view: Optional[str]) -> Optional[list]:
+    """
+    Resolve ?fields=a,b / ?view=summary into the KYC.data keys to select.
+    Returns None when neither is given (full legacy response).
+    """
+    if view is not None and view != "summary":
+        raise HTTPException(status_code=400, detail=f"Unknown view '{view}'")
+    keys = list(KYC_SUMMARY_FIELDS) if view == "summary" else []
+    if fields:
+        for key in (f.strip() for f in fields.split(",")):
+            if not key:
+                continue
+            if not _FIELD_NAME.match(key):
+                raise HTTPException(status_code=400, detail=f"Invalid field name '{key}'")
+            if key not in keys:
+                keys.append(key)
+    if view is None and not fields:
+        return None
+    if len(keys) > MAX_PROJECTION_FIELDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PROJECTION_FIELDS} fields can be requested")
+    return keys
+
+def get_kyc_projection(kyc_id: int, keys: list, db) -> Optional[dict]:
+    """
+    Slim view of a KYC: only `keys` from KYC.data, selected in SQL, with
+    images replaced by links to the cacheable image endpoint.
+    """
+    row = load_kyc_projection(kyc_id, keys, KYC_IMAGE_FIELDS, db)
+    if not row:
+        return None
+    status = row["kyc_status"]
+    return {
+        "kyc_id": row["kyc_id"],
+        "user_id": row["user_id"],
+        "kyc_email": row["kyc_email"],
+        "kyc_mobile": row["kyc_mobile"],
+        "submitted_at": row["submitted_at"],
+        "kyc_status": status.value if hasattr(status, "value") else status,
+        "data": {
+            key: row[f"data.{key}"]
+            for key in keys
+            if f"data.{key}" in row and row[f"data.{key}"] is not None
+        },
+        "images": {
+            name: image_url(kyc_id, name, row[f"image.{name}"])
+            for name in KYC_IMAGE_FIELDS
+        },
+    }
+
+def get_kyc_thumbnail(kyc_id: int, db):
+    """
+    Returns (jpeg bytes, digest) for the dashboard thumbnail, or None.
+    Photos saved before thumbnails existed get one built from the photo; it is
+    not written back, so serving a thumbnail never locks or updates the KYC.
+    """
+    thumbnail_ref = get_kyc_data_text(kyc_id, ("photoThumbnail",), db)
+    if not is_blob_ref(thumbnail_ref):
+        thumbnail_ref = build_thumbnail_ref(get_kyc_data_text(kyc_id, ("photoImage",), db))
+        if not thumbnail_ref:
+            return None
+    digest = parse_blob_ref(thumbnail_ref)
+    return read_thumbnail(digest), digest
+
+def get_kyc_image(kyc_id: int, image_name: str, db):
+    """
+    Returns (chunk iterator, content type, SHA-256 digest) for a stored KYC image, or None.
+    Only the image's own value is selected from KYC.data. Rows saved before the
+    blob store existed still carry inline base64 and are decoded here.
+    """
+    value = get_kyc_data_text(kyc_id, KYC_IMAGE_FIELDS[image_name], db)
+    if not value:
+        return None
+    if is_blob_ref(value):
+        digest = parse_blob_ref(value)
+        store = get_blob_store()
+        try:
+            with store.open(digest) as fh:
+                content_type = guess_content_type(fh.read(16))
+        except (BlobNotFoundError, ValueError):
+            logger.warning(f"Image blob missing for KYC ID {kyc_id}: {value}")
+            return None
+        return store.iter_chunks(digest, DEFAULT_CHUNK_SIZE), content_type, digest
+
+    # Legacy rows hold megabytes of inline base64; decode and hash it off the GIL
+    try:
+        raw, digest = get_compute_pool().run(decode_base64_with_digest, value)
+    except ValueError:
+        logger.warning(f"Undecodable inline image for KYC ID {kyc_id}")
+        return None
+    return iter([raw]), guess_content_type(raw[:16]), digest
+
+def build_pdf_data(data: dict) -> dict:
+    """Template input for the KYC PDF, with stored image references resolved to base64."""
     try:
-        user_data = dict_to_dataclass(data, UserData)
+        user_data = dict_to_dataclass(hydrate_kyc_images(data), UserData)
         generated_date = datetime.now(ZoneInfo("Asia/Kolkata")).strftime("%d-%m-%Y %I:%M %p")
 
         pdf_data = asdict(user_data)
@@ -141,130 +288,283 @@ def generate_kyc_pdf(kyc_id: int, db_session):
             status_code=400,
             detail=f"Invalid data structure: {str(e)}"
         )
+    return pdf_data
+
+def get_kyc_pdf_state(kyc_id: int, db_session):
+    """
+    Status and version of the KYC's PDF (see load_kyc_pdf_state), or None
+    while the KYC is PENDING and has no PDF.
+    """
+    state = load_kyc_pdf_state(kyc_id, db_session)
+    if not state:
+        raise HTTPException(status_code=404, detail="KYC ID not found")
+    if state.status == KYCStatus.PENDING.value:
+        print("KYC is in PENDING status. Cannot generate PDF.")
+        return None
+    return state
 
-    pdf = DynamicPDF()
-    pdf_bytes = pdf.generate(pdf_data)
+def generate_kyc_pdf(kyc_id: int, db_session, state=None):
+    """
+    Chunks of the KYC's PDF. The stored render is streamed when it was made
+    from the current data; otherwise the PDF is rendered on the compute
+    pool and stored for the next download. None while PENDING.
+    """
+    if state is None:
+        state = get_kyc_pdf_state(kyc_id, db_session)
+        if state is None:
+            return None
 
-    return pdf_bytes
+    if state.stored_version == state.version:
+        chunks = open_stored_pdf(state.blob_digest)
+        if chunks is not None:
+            return chunks
+
+    pdf_data = build_pdf_data(get_kyc_data(kyc_id, db_session))
+    pdf_bytes = get_compute_pool().run(render_pdf_document, pdf_data, timeout=PDF_RENDER_TIMEOUT)
+    try:
+        store_kyc_pdf(kyc_id, state.version, pdf_bytes, db_session)
+    except Exception as e:
+        # The download still succeeds; the next one renders again
+        db_session.rollback()
+        logger.warning(f"Failed to store PDF for KYC ID {kyc_id}: {e}")
+    return iter([pdf_bytes])
+
+def _prepare_pdf_render(kyc_id: int, db_session):
+    state = load_kyc_pdf_state(kyc_id, db_session)
+    if not state or state.status == KYCStatus.PENDING.value or state.stored_version == state.version:
+        return None
+    return state.version, build_pdf_data(get_kyc_data(kyc_id, db_session))
+
+async def prerender_kyc_pdf(kyc_id: int, db_session):
+    """
+    Render and store the KYC's PDF ahead of the first download. Does nothing
+    while the KYC is PENDING or when the stored PDF already matches its data,
+    so it is safe to queue after every status change. The session is only
+    used from worker threads.
+    """
+    try:
+        prepared = await asyncio.to_thread(_prepare_pdf_render, kyc_id, db_session)
+    except HTTPException as e:
+        logger.warning(f"Skipping PDF for KYC ID {kyc_id}: {e.detail}")
+        return
+    if prepared is None:
+        return
+    version, pdf_data = prepared
+    pdf_bytes = await get_compute_pool().run_async(render_pdf_document, pdf_data, timeout=PDF_RENDER_TIMEOUT)
+    await asyncio.to_thread(store_kyc_pdf, kyc_id, version, pdf_bytes, db_session)
 
 def submit_user(kyc_id: int, db):
-    user_status = get_kyc_status_log(kyc_id,db)
+    """
+    Moves a PENDING KYC to UNDER_REVIEW under the lock taken by
+    lock_kyc_status, and queues the Kyra match job in the same commit so a
+    submitted KYC is never left without its review. Returns (kyc_id, job_id);
+    kyc_id is None if the ID is unknown and job_id is None if nothing was submitted.
+    """
+    user_status = lock_kyc_status(kyc_id, db)
     print("User Status:", user_status)
     if user_status and user_status.status == KYCStatus.PENDING.value:
         # Here you can add additional verification logic if needed
         # For now, we will just change the status to SUBMITTED
-        updated_status = update_kyc_status_log(kyc_id, KYCStatus.UNDER_REVIEW.value, db)
-        return True
+        name = get_kyc_data_text(kyc_id, ("name",), db)
+        user_status.status = KYCStatus.UNDER_REVIEW.value
+        user_status.changed_at = datetime.utcnow()
+        # The PDF is rendered once the Kyra job has merged its results (see run_kyra_match)
+        job_id = enqueue_job(db, KYRA_MATCH_JOB, {"kyc_id": kyc_id})
+        record_status_change(
+            kyc_id, user_status.admin_id, user_status.admin_id, KYCStatus.PENDING, KYCStatus.UNDER_REVIEW,
+            changed_at=user_status.changed_at, name=name, name_known=True
+        )
+        return kyc_id, job_id
     else:
+        db.rollback()
         print(F"User Status Invalid:", user_status)
         print("Cannot submit KYC. It is not in PENDING status.")
-        return False
+        return (kyc_id if user_status else None), None
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
 
-def kyra_match_agent(kyc_id: int, data):
+def kyra_match_agent(kyc_id: int, data, deadline: Optional[float] = None):
+    """
+    Runs in a worker thread, which cannot be cancelled, so the time.monotonic()
+    `deadline` bounds both the wait for a client and the agent run itself.
+    """
     json_data = data.data
     # logging.info(f"KYRA MATCH AGENT DATA: {json_data}")
     logger.info(f"PERPOA : {json_data.get('permanentAddressDocuments', {}).get('ovdType', '')}")
-    kyc_client = KYCClient()
-    match_result = kyc_client.match_document(
-            name=json_data.get("name", ""),
-            dob=json_data.get("dob", ""),
-            gender=json_data.get("gender", ""),
-            father_name=json_data.get("fatherName", ""),
-            spouse_name=json_data.get("spouseName", ""),
-            email=json_data.get("emailId", ""),
-            mobile=json_data.get("mobileNo", ""),
-
-            cor_poa_image=_clean_base64(json_data.get("corporateAddressDocuments", {}).get("ovdImage", "")),
-            cor_poa_type=map_ovd_type(json_data.get("corporateAddressDocuments", {}).get("ovdType", "")),
-            cor_poa_number=json_data.get("corporateAddressDocuments", {}).get("ovdNumber", ""),
-            cor_address=json_data.get("permanentAddress", {}).get("streetAddress", "") + ", " + json_data.get("permanentAddress", {}).get("city", "") + ", " + json_data.get("permanentAddress", {}).get("state", "") + ", " + json_data.get("permanentAddress", {}).get("country", "India") + " - " + json_data.get("permanentAddress", {}).get("zipCode", ""),
-            cor_city=json_data.get("corporateAddress", {}).get("city", ""),
-            cor_state=json_data.get("corporateAddress", {}).get("state", ""),
-            cor_country=json_data.get("corporateAddress", {}).get("country", "India"),
-            cor_pin=json_data.get("corporateAddress", {}).get("zipCode", ""),
-
-            per_poa_image = _clean_base64(json_data.get("permanentAddressDocuments", {}).get("ovdImage", "")),
-            per_poa_type=map_ovd_type(json_data.get("permanentAddressDocuments", {}).get("ovdType", "")),
-            per_poa_number=json_data.get("permanentAddressDocuments", {}).get("ovdNumber", ""),
-            per_address=json_data.get("permanentAddress", {}).get("streetAddress", "") + ", " + json_data.get("permanentAddress", {}).get("city", "") + ", " + json_data.get("permanentAddress", {}).get("state", "") + ", " + json_data.get("permanentAddress", {}).get("country", "India") + " - " + json_data.get("permanentAddress", {}).get("zipCode", ""),
-            per_city=json_data.get("permanentAddress", {}).get("city", ""),
-            per_state=json_data.get("permanentAddress", {}).get("state", ""),
-            per_country=json_data.get("permanentAddress", {}).get("country", "India"),
-            per_pin=json_data.get("permanentAddress", {}).get("zipCode", ""),
-
-            photo_image=_clean_base64(json_data.get("photoImage", ""))
-        )
+    # Clients are built once per process and lent out; see KYC_CLIENT_POOL_SIZE
+    with get_kyc_client_pool().client(timeout=_remaining(deadline)) as kyc_client:
+        match_result = kyc_client.match_document(
+                name=json_data.get("name", ""),
+                dob=json_data.get("dob", ""),
+                gender=json_data.get("gender", ""),
+                father_name=json_data.get("fatherName", ""),
+                spouse_name=json_data.get("spouseName", ""),
+                email=json_data.get("emailId", ""),
+                mobile=json_data.get("mobileNo", ""),
+
+                cor_poa_image=resolve_image_base64(json_data.get("corporateAddressDocuments", {}).get("ovdImage", "")),
+                cor_poa_type=map_ovd_type(json_data.get("corporateAddressDocuments", {}).get("ovdType", "")),
+                cor_poa_number=json_data.get("corporateAddressDocuments", {}).get("ovdNumber", ""),
+                cor_address=json_data.get("permanentAddress", {}).get("streetAddress", "") + ", " + json_data.get("permanentAddress", {}).get("city", "") + ", " + json_data.get("permanentAddress", {}).get("state", "") + ", " + json_data.get("permanentAddress", {}).get("country", "India") + " - " + json_data.get("permanentAddress", {}).get("zipCode", ""),
+                cor_city=json_data.get("corporateAddress", {}).get("city", ""),
+                cor_state=json_data.get("corporateAddress", {}).get("state", ""),
+                cor_country=json_data.get("corporateAddress", {}).get("country", "India"),
+                cor_pin=json_data.get("corporateAddress", {}).get("zipCode", ""),
+
+                per_poa_image = resolve_image_base64(json_data.get("permanentAddressDocuments", {}).get("ovdImage", "")),
+                per_poa_type=map_ovd_type(json_data.get("permanentAddressDocuments", {}).get("ovdType", "")),
+                per_poa_number=json_data.get("permanentAddressDocuments", {}).get("ovdNumber", ""),
+                per_address=json_data.get("permanentAddress", {}).get("streetAddress", "") + ", " + json_data.get("permanentAddress", {}).get("city", "") + ", " + json_data.get("permanentAddress", {}).get("state", "") + ", " + json_data.get("permanentAddress", {}).get("country", "India") + " - " + json_data.get("permanentAddress", {}).get("zipCode", ""),
+                per_city=json_data.get("permanentAddress", {}).get("city", ""),
+                per_state=json_data.get("permanentAddress", {}).get("state", ""),
+                per_country=json_data.get("permanentAddress", {}).get("country", "India"),
+                per_pin=json_data.get("permanentAddress", {}).get("zipCode", ""),
+
+                photo_image=resolve_image_base64(json_data.get("photoImage", "")),
+                time_budget=_remaining(deadline)
+            )
     return match_result
 
-async def kyra_match_agent_bg(kyc_id: int, data: dict, smtp_server, smtp_port,sender_email,sender_password):
+async def _load_kyc_record(kyc_id: int):
+    async with async_session_maker() as session:
+        kyc_record = await session.get(KYC, kyc_id)
+        return (kyc_record.data or {}), (kyc_record.ai_notes or {})
+
+async def _save_kyc_update(kyc_id: int, values: dict):
     async with async_session_maker() as session:
-        result = await asyncio.to_thread(kyra_match_agent, kyc_id, data)
-        per_poa = result.get("data", {}).get("perPOA", {})
-        cor_poa = result.get("data", {}).get("corPOA", {})
-        per_poa_ok = await is_all_confidence_high(per_poa)
-        cor_poa_ok = await is_all_confidence_high(cor_poa)
-        approve = False
-        input_data = {
-            "perPOA": per_poa,
-            "corPOA": cor_poa
-        }
         await session.execute(
             update(KYC)
             .where(KYC.kyc_id == kyc_id)
-            .values(data=cast(KYC.data, JSONB).op("||")(input_data))
+            .values(**values)
         )
         await session.commit()
-        logger.info(f"KYC updated for ID {kyc_id}")
-        ai_notes = {
-            "livenessReview": "",
-            "kycMatchReview": "",
-            "tamperReview": "",
-            "riskScore": ""
+
+async def _to_thread_to_completion(func, *args):
+    """
+    asyncio.to_thread that, when cancelled, still waits for the thread to
+    return before re-raising. A thread cannot be stopped, so this keeps a
+    timed-out job from being released for a retry that would overlap it.
+    """
+    future = asyncio.ensure_future(asyncio.to_thread(func, *args))
+    cancelled = False
+    while not future.done():
+        try:
+            await asyncio.wait([future])
+        except asyncio.CancelledError:
+            cancelled = True
+    if cancelled:
+        raise asyncio.CancelledError()
+    return future.result()
+
+def build_kyra_review_steps(kyc_id: int, data, deadline: Optional[float] = None) -> list:
+    """
+    The review pipeline as a DAG. Document matching and the record load run
+    concurrently; the confidence checks and both AI reviews start as soon as
+    their own inputs are ready instead of waiting on each other. `deadline`
+    (time.monotonic()) is handed to the matching thread.
+    """
+    async def match():
+        result = await _to_thread_to_completion(kyra_match_agent, kyc_id, data, deadline)
+        return {
+            "perPOA": result.get("data", {}).get("perPOA", {}),
+            "corPOA": result.get("data", {}).get("corPOA", {})
         }
-        kyc_record = await session.get(KYC, kyc_id)
-        existing_data = kyc_record.data or {}
-        existing_ai_notes = kyc_record.ai_notes or {}
+
+    async def save_match(match):
+        await _save_kyc_update(kyc_id, {"data": cast(KYC.data, JSONB).op("||")(match)})
+        logger.info(f"KYC updated for ID {kyc_id}")
+
+    async def per_poa_ok(match):
+        return await is_all_confidence_high(match["perPOA"])
+
+    async def cor_poa_ok(match):
+        return await is_all_confidence_high(match["corPOA"])
+
+    async def match_review(match):
+        return await generate_kyc_match_review(match, kyc_id)
+
+    async def record():
+        return await _load_kyc_record(kyc_id)
+
+    async def liveness_review(record):
+        existing_data, _ = record
+        if not existing_data.get("livenessStatus"):
+            return ""
         liveness_data = {
-            "livenessImage": _clean_base64(existing_data.get("livenessImage")),
+            "livenessImage": await asyncio.to_thread(resolve_image_base64, existing_data.get("livenessImage")),
             "livenessScore": existing_data.get("livenessScore"),
             "livenessStatus": existing_data.get("livenessStatus"),
         }
-        ai_notes['kycMatchReview'] = await generate_kyc_match_review(input_data, kyc_id)
-        if liveness_data.get("livenessStatus"):
-            ai_notes["livenessReview"] = await generate_liveness_review(liveness_data)
+        return await generate_liveness_review(liveness_data)
 
-        ai_notes["tamperReview"] = existing_ai_notes.get("tamperReview")
-        
-        if per_poa and cor_poa:
-            if per_poa_ok and cor_poa_ok:
-                approve = True
-        elif per_poa:
-            if per_poa_ok:
-                approve = True
-        elif cor_poa:
-            if cor_poa_ok:
-                approve = True
-                
-                
+    return [
+        DagStep("match", match),
+        DagStep("record", record),
+        DagStep("save_match", save_match, ("match",)),
+        DagStep("per_poa_ok", per_poa_ok, ("match",)),
+        DagStep("cor_poa_ok", cor_poa_ok, ("match",)),
+        DagStep("match_review", match_review, ("match",)),
+        DagStep("liveness_review", liveness_review, ("record",)),
+    ]
+
+async def kyra_match_agent_bg(kyc_id: int, data: dict, smtp_server, smtp_port,sender_email,sender_password, review_key: Optional[str] = None):
+    """
+    Runs the Kyra review and saves its AI notes, auto-approving when every
+    document matched. `review_key` is stored with the notes so a retried job
+    can tell that this submission was already reviewed.
+    """
+    deadline = time.monotonic() + KYRA_REVIEW_TIMEOUT
+    try:
+        results = await run_dag(build_kyra_review_steps(kyc_id, data, deadline), timeout=KYRA_REVIEW_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.error(f"Kyra review for KYC ID {kyc_id} exceeded {KYRA_REVIEW_TIMEOUT}s budget")
+        raise
+
+    per_poa = results["match"]["perPOA"]
+    cor_poa = results["match"]["corPOA"]
+    per_poa_ok = results["per_poa_ok"]
+    cor_poa_ok = results["cor_poa_ok"]
+    existing_data, existing_ai_notes = results["record"]
+    ai_notes = {
+        "livenessReview": results["liveness_review"],
+        "kycMatchReview": results["match_review"],
+        "tamperReview": existing_ai_notes.get("tamperReview"),
+        "riskScore": "",
+        "reviewKey": review_key,
+    }
+
+    approve = False
+    if per_poa and cor_poa:
+        if per_poa_ok and cor_poa_ok:
+            approve = True
+    elif per_poa:
+        if per_poa_ok:
+            approve = True
+    elif cor_poa:
+        if cor_poa_ok:
+            approve = True
+
+    async with async_session_maker() as session:
         if approve:
+            previous = (await session.execute(
+                select(KYCStatusLog.admin_id, KYCStatusLog.status)
+                .where(KYCStatusLog.kyc_id == kyc_id)
+                .with_for_update()
+            )).one_or_none()
             await session.execute(
                 update(KYCStatusLog)
                 .where(KYCStatusLog.kyc_id == kyc_id)
                 .values(status=KYCStatus.APPROVED)
             )
             ai_notes["riskScore"] = 0
-            user_name = existing_data.get("name", "")
-            email = existing_data.get("emailId", "")
-            email_manager = EmailManager(smtp_server, smtp_port, sender_email, sender_password)
-            email_manager.send_congrats_email(recipient_email=email,
-                user_name = user_name,
-                kyc_id=kyc_id)
-                
-            
         else:
-            logger.info("Not going for auto-approval")        
-            ai_notes["riskScore"] = await generate_risk_score(ai_notes)
-        
+            logger.info("Not going for auto-approval")
+            # The risk score needs both reviews, so it gets whatever is left of the budget
+            ai_notes["riskScore"] = await asyncio.wait_for(
+                generate_risk_score(ai_notes), timeout=_remaining(deadline)
+            )
+
         logger.info(f"Generated AI notes for KYC ID {kyc_id}: {ai_notes}")
         await session.execute(
             update(KYC)
@@ -273,7 +573,15 @@ async def kyra_match_agent_bg(kyc_id: int, data: dict, smtp_server, smtp_port,se
         )
         await session.commit()
         logger.info(f"AI notes saved for KYC ID {kyc_id}")
-        
-
-
-        
+        if approve and previous is not None and previous.status != KYCStatus.APPROVED:
+            # changed_at is not touched by auto-approval, so only the counts move
+            record_status_change(kyc_id, previous.admin_id, previous.admin_id, previous.status, KYCStatus.APPROVED)
+            # Mailed only once the approval is committed, and only for the transition itself
+            email_manager = EmailManager(smtp_server, smtp_port, sender_email, sender_password, dispatcher=get_mail_dispatcher())
+            try:
+                email_manager.send_congrats_email(recipient_email=existing_data.get("emailId", ""),
+                    user_name = existing_data.get("name", ""),
+                    kyc_id=kyc_id)
+            except Exception as e:
+                # The approval is committed; a full mail queue must not fail the job
+                logger.error(f"Congrats email for KYC ID {kyc_id} not sent: {e}")
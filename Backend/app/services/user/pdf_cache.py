@@ -0,0 +1,33 @@
+import logging
+from typing import Iterator, Optional
+from kyc_storage import get_blob_store, DEFAULT_CHUNK_SIZE
+from .user_db import save_kyc_pdf
+
+logger = logging.getLogger(__name__)
+
+# Rendered PDFs live in the blob store; the kyc_pdfs table maps each KYC to
+# its current document and the md5 of KYC.data it was rendered from.
+
+
+def open_stored_pdf(blob_digest: Optional[str]) -> Optional[Iterator[bytes]]:
+    """Chunks of a stored PDF, or None if it is missing from the blob store."""
+    store = get_blob_store()
+    if not blob_digest or not store.exists(blob_digest):
+        return None
+    return store.iter_chunks(blob_digest, DEFAULT_CHUNK_SIZE)
+
+
+def discard_pdf_blob(blob_digest: Optional[str]) -> None:
+    if not blob_digest:
+        return
+    try:
+        get_blob_store().delete(blob_digest)
+    except Exception as e:
+        logger.warning(f"Failed to delete stored PDF {blob_digest}: {e}")
+
+
+def store_kyc_pdf(kyc_id: int, version: str, pdf_bytes: bytes, db) -> str:
+    """Store a rendered PDF as the current one for `version` and drop the file it replaces."""
+    blob_digest = get_blob_store().put(pdf_bytes)
+    discard_pdf_blob(save_kyc_pdf(kyc_id, version, blob_digest, db))
+    return blob_digest
@@ -2,16 +2,152 @@ from datetime import datetime
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from kyc_db import User, KYC, KYCStatusLog, KYCStatus
+from kyc_db import User, KYC, KYCStatusLog, KYCStatus, KYCPdf
+from sqlalchemy import Text, cast, func, update
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
 from sqlalchemy.orm import Session
 from sqlalchemy.orm.attributes import flag_modified
+from services.admin.summary_cache import record_status_change
+
+def load_kyc_state(kyc_id: int, db: Session):
+    """
+    Fetch the KYC row and its status log in one joined query.
+    Returns (kyc, status_log); both are None when the KYC does not exist.
+    """
+    row = db.execute(
+        select(KYC, KYCStatusLog)
+        .outerjoin(KYCStatusLog, KYCStatusLog.kyc_id == KYC.kyc_id)
+        .where(KYC.kyc_id == kyc_id)
+    ).first()
+    if not row:
+        return None, None
+    kyc, status_log = row
+    kyc.kyc_status = status_log.status if status_log else None
+    return kyc, status_log
+
+def lock_kyc_status(kyc_id: int, db: Session):
+    """
+    Lock the KYC and its status log (SELECT ... FOR UPDATE) until commit, so a
+    status check and the write that depends on it cannot race with a
+    concurrent submit or admin action. Only the status row is selected;
+    KYC.data, which can be megabytes, stays in Postgres.
+    Returns the status log, or None when the KYC does not exist.
+    """
+    return db.scalar(
+        select(KYCStatusLog)
+        .join(KYC, KYC.kyc_id == KYCStatusLog.kyc_id)
+        .where(KYCStatusLog.kyc_id == kyc_id)
+        .with_for_update()
+    )
+
+# Long enough for a "blob:sha256:<64 hex>" reference; legacy inline base64 is cut to this prefix in SQL
+IMAGE_REF_PREFIX_LENGTH = len("blob:sha256:") + 64
+
+def load_kyc_projection(kyc_id: int, keys: list, image_paths: dict, db: Session):
+    """
+    Fetch only the requested top-level KYC.data keys plus the status, without
+    pulling image payloads out of Postgres. Keys listed in `image_paths`
+    ({name: path in data}) come back as at most IMAGE_REF_PREFIX_LENGTH
+    characters, and document objects have their ovdImage removed in SQL.
+    Returns None when the KYC does not exist, else a row mapping with
+    `data.<key>` and `image.<name>` columns.
+    """
+    image_keys = {path[0] for path in image_paths.values() if len(path) == 1}
+    columns = [
+        KYC.kyc_id,
+        KYC.user_id,
+        KYC.kyc_email,
+        KYC.kyc_mobile,
+        KYC.submitted_at,
+        KYCStatusLog.status.label("kyc_status"),
+    ]
+    for key in keys:
+        if key in image_keys:
+            continue
+        value = KYC.data[key]
+        if key in ("permanentAddressDocuments", "corporateAddressDocuments"):
+            value = value.delete_path(["ovdImage"])
+        columns.append(value.label(f"data.{key}"))
+    for name, path in image_paths.items():
+        ref = KYC.data[path[0]].astext if len(path) == 1 else KYC.data[tuple(path)].astext
+        columns.append(func.substr(ref, 1, IMAGE_REF_PREFIX_LENGTH).label(f"image.{name}"))
+    row = db.execute(
+        select(*columns)
+        .outerjoin(KYCStatusLog, KYCStatusLog.kyc_id == KYC.kyc_id)
+        .where(KYC.kyc_id == kyc_id)
+    ).mappings().first()
+    return row
+
+def get_kyc_version(kyc_id: int, db: Session):
+    """
+    Content version of a KYC for HTTP validators: an md5 over every column the
+    KYC views render plus the status row, computed in Postgres so nothing
+    large is transferred. It changes whenever any writer touches those
+    columns. None if the KYC does not exist.
+    """
+    version = func.md5(func.concat_ws(
+        "|",
+        cast(KYC.user_id, Text),
+        KYC.kyc_email,
+        KYC.kyc_mobile,
+        cast(KYC.submitted_at, Text),
+        cast(KYC.data, Text),
+        cast(KYC.ai_notes, Text),
+        cast(KYCStatusLog.status, Text),
+        cast(KYCStatusLog.changed_at, Text),
+    ))
+    return db.scalar(
+        select(version)
+        .select_from(KYC)
+        .outerjoin(KYCStatusLog, KYCStatusLog.kyc_id == KYC.kyc_id)
+        .where(KYC.kyc_id == kyc_id)
+    )
+
+def load_kyc_pdf_state(kyc_id: int, db: Session):
+    """
+    Everything the PDF download needs to decide between the stored file and a
+    render, in one query: status, the md5 of KYC.data (the PDF version) and
+    the stored PDF's version and blob digest (None when nothing is stored).
+    Returns None if the KYC does not exist.
+    """
+    return db.execute(
+        select(
+            KYCStatusLog.status.label("status"),
+            func.md5(cast(KYC.data, Text)).label("version"),
+            KYCPdf.version.label("stored_version"),
+            KYCPdf.blob_digest.label("blob_digest"),
+        )
+        .select_from(KYC)
+        .outerjoin(KYCStatusLog, KYCStatusLog.kyc_id == KYC.kyc_id)
+        .outerjoin(KYCPdf, KYCPdf.kyc_id == KYC.kyc_id)
+        .where(KYC.kyc_id == kyc_id)
+    ).first()
+
+def save_kyc_pdf(kyc_id: int, version: str, blob_digest: str, db: Session):
+    """Upsert the stored PDF of a KYC and commit. Returns the digest it replaced, if any."""
+    previous = db.scalar(
+        select(KYCPdf.blob_digest).where(KYCPdf.kyc_id == kyc_id).with_for_update()
+    )
+    stmt = pg_insert(KYCPdf).values(kyc_id=kyc_id, version=version, blob_digest=blob_digest)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[KYCPdf.kyc_id],
+        set_={"version": stmt.excluded.version, "blob_digest": stmt.excluded.blob_digest, "created_at": func.now()},
+    ))
+    db.commit()
+    return previous if previous != blob_digest else None
+
+def get_kyc_data(kyc_id: int, db: Session):
+    """KYC.data alone, or None if the KYC does not exist."""
+    return db.scalar(select(KYC.data).where(KYC.kyc_id == kyc_id))
+
+def get_kyc_data_text(kyc_id: int, path: tuple, db: Session):
+    """A single text value from KYC.data (e.g. an image reference) without loading the row."""
+    value = KYC.data[path[0]].astext if len(path) == 1 else KYC.data[tuple(path)].astext
+    return db.scalar(select(value).where(KYC.kyc_id == kyc_id))
 
 def get_user_manager(kyc_id,db):
     try:
-       
-        user = db.scalar(select(KYC).where(KYC.kyc_id == kyc_id))
-        kyc_status = db.scalar(select(KYCStatusLog).where(KYCStatusLog.kyc_id == kyc_id))
-        user.kyc_status = kyc_status.status if kyc_status else None
+        user, _ = load_kyc_state(kyc_id, db)
         return user
     except Exception as e:
         raise e
@@ -56,6 +192,25 @@ def update_user_manager(kyc_id, update_data: KYC, db: Session):
         db.refresh(user)
         return user
         
+def patch_kyc_data(kyc_id: int, changes: dict, db: Session):
+    """
+    Merge only the changed top-level keys into KYC.data server-side
+    (data || changes) in a single UPDATE ... RETURNING round trip, instead
+    of loading, merging and rewriting the whole document.
+    """
+    user = db.scalar(
+        update(KYC)
+        .where(KYC.kyc_id == kyc_id)
+        .values(data=cast(KYC.data, JSONB).op("||")(cast(changes, JSONB)))
+        .returning(KYC)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    if not user:
+        db.rollback()
+        raise ValueError(f"KYC with id {kyc_id} not found")
+    db.commit()
+    return user
+
 def delete_user_manager(kyc_id,db):
     try:
         user = db.scalar(select(KYC).where(User.kyc_id == kyc_id))
@@ -82,6 +237,11 @@ def get_user_id_from_kyc(kyc_id: int,db) -> int:
         raise e
     
         
+def get_kyc_status(kyc_id: int, db: Session):
+    """Current status of a KYC without locking anything, or None when it does not exist."""
+    return db.scalar(select(KYCStatusLog.status).where(KYCStatusLog.kyc_id == kyc_id))
+
+
 def get_kyc_status_log(kyc_id,db):
     try:
         status_log = db.scalar(select(KYCStatusLog).where(KYCStatusLog.kyc_id == kyc_id))
@@ -101,11 +261,16 @@ def update_kyc_status_log(kyc_id: int, new_status: KYCStatus, db: Session):
             raise HTTPException(status_code=404, detail=f"KYCStatusLog for KYC {kyc_id} not found")
 
         # Update status & metadata
+        old_status = status_log.status
         status_log.status = new_status
         status_log.changed_at = datetime.utcnow()
 
         db.commit()
         db.refresh(status_log)
+        record_status_change(
+            kyc_id, status_log.admin_id, status_log.admin_id, old_status, new_status,
+            changed_at=status_log.changed_at
+        )
 
         return status_log
 
@@ -0,0 +1,95 @@
+"""
+Micro-benchmark: cost of getting a ready KYCClient per submission.
+
+    python benchmarks/client_construction.py [iterations]   # default 200
+
+"before" builds a new KYCClient (ChatOpenAI + tools + agent) every call, as
+kyra_match_agent used to; "after" borrows one from the warmed pool. No
+requests are sent to OpenAI - only construction/checkout is timed.
+
+Recorded on Python 3.11.7 (x86_64 Linux) in a virtualenv holding only these
+packages and their dependencies:
+
+    pip install langchain==0.3.30 langchain-openai==0.3.35 httpx==0.28.1 openai==2.54.0 pydantic==2.14.1
+    cd Backend/service_lib/kyc_client
+    PYTHONPATH=. taskset -c 0 python benchmarks/client_construction.py
+
+where taskset pins the run to one CPU core. Output:
+
+    Python 3.11.7, langchain 0.3.30, langchain-openai 0.3.35, httpx 0.28.1; 200 iterations
+    before: new KYCClient()      mean    3.606 ms   p50    0.455 ms   p95    0.663 ms   max  623.017 ms
+    after: pool checkout         mean    0.005 ms   p50    0.005 ms   p95    0.006 ms   max    0.037 ms
+    one-off pool warm-up            1.266 ms
+
+Across three runs "before" ranged over mean 3.6-4.5 ms, p50 0.46-0.63 ms and
+max 620-750 ms; "after" stayed at 5-7 microseconds.
+
+The 600-750 ms maximum is the first construction in a process (lazy LangChain and
+OpenAI initialisation). Without the pool it landed on the first submission a
+worker handled; warm_up() now pays it at startup. After that, building a
+client costs about 0.5 ms, against a few microseconds for a checkout. Reusing
+the keep-alive OpenAI connections is not part of this measurement.
+"""
+import os
+import sys
+import time
+import statistics
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-placeholder")
+
+from kyc_client import KYCClient, KYCClientPool
+
+# The recorded figures above use this default
+DEFAULT_ITERATIONS = 200
+
+
+def _time_calls(fn, iterations: int):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _report(label: str, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<28} mean {statistics.mean(samples):8.3f} ms   p50 {statistics.median(samples):8.3f} ms   "
+          f"p95 {p95:8.3f} ms   max {samples[-1]:8.3f} ms")
+
+
+def _environment() -> str:
+    from importlib.metadata import PackageNotFoundError, version
+    parts = [f"Python {sys.version.split()[0]}"]
+    for package in ("langchain", "langchain-openai", "httpx"):
+        try:
+            parts.append(f"{package} {version(package)}")
+        except PackageNotFoundError:
+            parts.append(f"{package} missing")
+    return ", ".join(parts)
+
+
+def main(iterations: int = DEFAULT_ITERATIONS):
+    before = _time_calls(KYCClient, iterations)
+
+    pool = KYCClientPool(size=1)
+    warm_start = time.perf_counter()
+    pool.warm_up()
+    warm_ms = (time.perf_counter() - warm_start) * 1000
+
+    def checkout():
+        with pool.client():
+            pass
+
+    after = _time_calls(checkout, iterations)
+    pool.close()
+
+    print(f"{_environment()}; {iterations} iterations")
+    _report("before: new KYCClient()", before)
+    _report("after: pool checkout", after)
+    print(f"{'one-off pool warm-up':<28} {warm_ms:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ITERATIONS)
@@ -1,3 +1,6 @@
+from .openai_pool import *
+from .vision_cache import *
 from .liveness_checker import *
 from .tamper_detector import *
-from .kyc_client import *
\ No newline at end of file
+from .kyc_client import *
+from .client_pool import *
\ No newline at end of file
@@ -0,0 +1,105 @@
+import os
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator, List, Optional
+
+import httpx
+
+from .openai_pool import (
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+    OPENAI_KEEPALIVE_EXPIRY,
+    OPENAI_TIMEOUT,
+    OPENAI_CONNECT_TIMEOUT,
+)
+from .kyc_client import KYCClient
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["KYCClientPool", "get_kyc_client_pool"]
+
+KYC_CLIENT_POOL_SIZE = int(os.getenv("KYC_CLIENT_POOL_SIZE", "4"))
+KYC_CLIENT_ACQUIRE_TIMEOUT = float(os.getenv("KYC_CLIENT_ACQUIRE_TIMEOUT", "120"))
+
+
+class KYCClientPool:
+    """
+    Fixed-size pool of ready KYCClient instances. The LangChain agent keeps
+    per-run state, so a client is lent to one thread at a time; all clients
+    share a single keep-alive httpx.Client so connections to OpenAI stay warm
+    between submissions.
+    """
+
+    def __init__(self, size: int = KYC_CLIENT_POOL_SIZE, acquire_timeout: float = KYC_CLIENT_ACQUIRE_TIMEOUT):
+        self.size = max(1, size)
+        self.acquire_timeout = acquire_timeout
+        self._idle: "queue.LifoQueue[KYCClient]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+        )
+
+    def _new_client(self) -> Optional[KYCClient]:
+        with self._lock:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            return KYCClient(http_client=self._http_client)
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def warm_up(self) -> int:
+        """Build every client up front (call at startup). Returns the number created."""
+        clients: List[KYCClient] = []
+        while True:
+            client = self._new_client()
+            if client is None:
+                break
+            clients.append(client)
+        for client in clients:
+            self._idle.put(client)
+        if clients:
+            logger.info(f"KYC client pool warmed with {len(clients)} clients")
+        return len(clients)
+
+    @contextmanager
+    def client(self, timeout: Optional[float] = None) -> Iterator[KYCClient]:
+        """
+        Borrow a client, creating one lazily while the pool is below its size.
+        `timeout` overrides the pool's acquire timeout for this call.
+        """
+        acquire_timeout = self.acquire_timeout if timeout is None else timeout
+        try:
+            client = self._idle.get_nowait()
+        except queue.Empty:
+            client = self._new_client()
+            if client is None:
+                try:
+                    client = self._idle.get(timeout=acquire_timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No KYC client available within {acquire_timeout}s")
+        try:
+            yield client
+        finally:
+            self._idle.put(client)
+
+    def close(self) -> None:
+        self._http_client.close()
+
+
+@lru_cache()
+def get_kyc_client_pool() -> KYCClientPool:
+    """Process-wide pool; sized by KYC_CLIENT_POOL_SIZE."""
+    return KYCClientPool()
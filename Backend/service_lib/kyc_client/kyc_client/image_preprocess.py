@@ -0,0 +1,56 @@
+import io
+import base64
+import logging
+from typing import Tuple
+
+try:
+    from PIL import Image, ImageOps
+except ImportError as e:
+    logging.warning(f"Pillow not installed, vision images are sent unmodified: {e}")
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["target_size", "prepare_image_base64"]
+
+
+def target_size(width: int, height: int, max_long_side: int, max_short_side: int) -> Tuple[int, int]:
+    """Largest size that fits both limits while keeping the aspect ratio (never upscales)."""
+    long_side, short_side = max(width, height), min(width, height)
+    scale = min(1.0, max_long_side / long_side, max_short_side / short_side)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def prepare_image_base64(image_base64: str, max_long_side: int, max_short_side: int, quality: int = 85) -> str:
+    """
+    Decode, apply EXIF orientation, downscale to the resolution the vision
+    model actually analyses and re-encode as JPEG. The model resizes larger
+    images itself, so anything above the target only costs upload time.
+    Falls back to the original input if Pillow is missing or decoding fails.
+    """
+    if Image is None or not image_base64:
+        return image_base64
+    try:
+        raw = base64.b64decode(image_base64)
+        with Image.open(io.BytesIO(raw)) as img:
+            size = target_size(img.width, img.height, max_long_side, max_short_side)
+            # draft() lets the JPEG decoder skip most of the work for large photos
+            img.draft("RGB", size)
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            size = target_size(img.width, img.height, max_long_side, max_short_side)
+            if size != img.size:
+                img = img.resize(size, Image.LANCZOS)
+
+            out = io.BytesIO()
+            img.save(out, format="JPEG", quality=quality, optimize=True)
+
+        encoded = base64.b64encode(out.getvalue()).decode("ascii")
+        if len(encoded) >= len(image_base64):
+            # Already small and compact - keep the original bytes
+            return image_base64
+        return encoded
+    except Exception as e:
+        logger.warning(f"Image preprocessing failed, sending original: {e}")
+        return image_base64
@@ -21,6 +21,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Skip the LLM agent when the rule-based checks alone settle the outcome
+KYC_RULES_FAST_PATH = os.getenv("KYC_RULES_FAST_PATH", "true").lower() == "true"
+
 class KYCData(BaseModel):
     """Pydantic model for KYC data validation."""
     name: str
@@ -46,7 +49,12 @@ class KYCData(BaseModel):
     per_pin: Optional[str] = ""
 
 class KYCClient:
-    def __init__(self):
+    def __init__(self, http_client=None):
+        """
+        Building the client (LLM, tools, agent) is expensive; prefer borrowing
+        one from get_kyc_client_pool() over constructing one per request.
+        `http_client` lets several clients share one pooled httpx.Client.
+        """
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.request_id = os.getenv("REQUEST_ID", "kyra")
         self.model_name = os.getenv("OPENAI_MODEL", "gpt-4")
@@ -59,7 +67,8 @@ class KYCClient:
             openai_api_key=self.openai_api_key,
             model_name=self.model_name,
             temperature=0.1,
-            max_tokens=2000
+            max_tokens=2000,
+            **({"http_client": http_client} if http_client is not None else {})
         )
         
         # Initialize LangChain agent
@@ -71,6 +80,123 @@ class KYCClient:
             verbose=True
         )
 
+    def _validate_document_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate and process KYC document data."""
+        try:
+            kyc_data = KYCData(**data)
+            
+            # Perform validation logic
+            validation_results = []
+            
+            # Name validation
+            if not kyc_data.name or len(kyc_data.name.strip()) < 2:
+                validation_results.append("Invalid name: Name must be at least 2 characters")
+            
+            # Mobile validation
+            if kyc_data.mobile and not kyc_data.mobile.isdigit():
+                validation_results.append("Invalid mobile: Mobile number must contain only digits")
+            
+            # Email validation
+            if kyc_data.email and "@" not in kyc_data.email:
+                validation_results.append("Invalid email: Email must contain @ symbol")
+            
+            # PIN code validation
+            if kyc_data.cor_pin and (not kyc_data.cor_pin.isdigit() or len(kyc_data.cor_pin) != 6):
+                validation_results.append("Invalid correspondence PIN: Must be 6 digits")
+            
+            if kyc_data.per_pin and (not kyc_data.per_pin.isdigit() or len(kyc_data.per_pin) != 6):
+                validation_results.append("Invalid permanent PIN: Must be 6 digits")
+            
+            if validation_results:
+                return {
+                    "success": False,
+                    "errors": validation_results,
+                    "requestId": self.request_id
+                }
+            
+            return {
+                "success": True,
+                "message": "KYC data validation successful",
+                "data": kyc_data.dict(),
+                "requestId": self.request_id
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "requestId": self.request_id
+            }
+
+    def _analyze_document_consistency(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze consistency between different document data."""
+        try:
+            kyc_data = KYCData(**data)
+            
+            consistency_issues = []
+            
+            # Check address consistency
+            if (kyc_data.cor_address and kyc_data.per_address and 
+                kyc_data.cor_address != kyc_data.per_address):
+                consistency_issues.append("Address mismatch between correspondence and permanent addresses")
+            
+            # Check PIN consistency
+            if (kyc_data.cor_pin and kyc_data.per_pin and 
+                kyc_data.cor_pin != kyc_data.per_pin):
+                consistency_issues.append("PIN code mismatch between correspondence and permanent addresses")
+            
+            # Check document number consistency (if same document type)
+            if (kyc_data.cor_poa_type and kyc_data.per_poa_type and
+                kyc_data.cor_poa_type == kyc_data.per_poa_type and
+                kyc_data.cor_poa_number and kyc_data.per_poa_number and
+                kyc_data.cor_poa_number != kyc_data.per_poa_number):
+                consistency_issues.append("Document number mismatch for same document type")
+            
+            confidence_score = max(0, 100 - (len(consistency_issues) * 25))
+            
+            return {
+                "success": True,
+                "consistency_score": confidence_score,
+                "issues": consistency_issues,
+                "recommendation": "Approved" if confidence_score >= 75 else "Needs Review",
+                "requestId": self.request_id
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "requestId": self.request_id
+            }
+
+    def _run_rule_checks(self, kyc_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Run both validators directly. Returns the rule analysis when it is
+        conclusive - invalid data, or valid data with no consistency issues -
+        and None when the agent should weigh the issues instead.
+        """
+        validation = self._validate_document_data(kyc_data)
+        if not validation.get("success"):
+            if "errors" not in validation:
+                # The validator itself failed - let the agent look at the raw data
+                return None
+            return {
+                "validation": validation,
+                "consistency": None,
+                "recommendation": "Needs Review",
+                "summary": "Needs Review: " + "; ".join(validation["errors"]),
+            }
+
+        consistency = self._analyze_document_consistency(kyc_data)
+        if consistency.get("success") and not consistency.get("issues"):
+            return {
+                "validation": validation,
+                "consistency": consistency,
+                "recommendation": "Approved",
+                "summary": "Approved: KYC data is valid and all documents are consistent",
+            }
+        return None
+
     def _create_kyc_tools(self):
         """Create tools for KYC processing agent."""
         
@@ -78,92 +204,17 @@ class KYCClient:
             """Validate and process KYC document data."""
             try:
                 data = json.loads(data_json)
-                kyc_data = KYCData(**data)
-                
-                # Perform validation logic
-                validation_results = []
-                
-                # Name validation
-                if not kyc_data.name or len(kyc_data.name.strip()) < 2:
-                    validation_results.append("Invalid name: Name must be at least 2 characters")
-                
-                # Mobile validation
-                if kyc_data.mobile and not kyc_data.mobile.isdigit():
-                    validation_results.append("Invalid mobile: Mobile number must contain only digits")
-                
-                # Email validation
-                if kyc_data.email and "@" not in kyc_data.email:
-                    validation_results.append("Invalid email: Email must contain @ symbol")
-                
-                # PIN code validation
-                if kyc_data.cor_pin and (not kyc_data.cor_pin.isdigit() or len(kyc_data.cor_pin) != 6):
-                    validation_results.append("Invalid correspondence PIN: Must be 6 digits")
-                
-                if kyc_data.per_pin and (not kyc_data.per_pin.isdigit() or len(kyc_data.per_pin) != 6):
-                    validation_results.append("Invalid permanent PIN: Must be 6 digits")
-                
-                if validation_results:
-                    return json.dumps({
-                        "success": False,
-                        "errors": validation_results,
-                        "requestId": self.request_id
-                    })
-                
-                return json.dumps({
-                    "success": True,
-                    "message": "KYC data validation successful",
-                    "data": kyc_data.dict(),
-                    "requestId": self.request_id
-                })
-                
             except Exception as e:
-                return json.dumps({
-                    "success": False,
-                    "error": str(e),
-                    "requestId": self.request_id
-                })
+                return json.dumps({"success": False, "error": str(e), "requestId": self.request_id})
+            return json.dumps(self._validate_document_data(data))
         
         def analyze_document_consistency(data_json: str) -> str:
             """Analyze consistency between different document data."""
             try:
                 data = json.loads(data_json)
-                kyc_data = KYCData(**data)
-                
-                consistency_issues = []
-                
-                # Check address consistency
-                if (kyc_data.cor_address and kyc_data.per_address and 
-                    kyc_data.cor_address != kyc_data.per_address):
-                    consistency_issues.append("Address mismatch between correspondence and permanent addresses")
-                
-                # Check PIN consistency
-                if (kyc_data.cor_pin and kyc_data.per_pin and 
-                    kyc_data.cor_pin != kyc_data.per_pin):
-                    consistency_issues.append("PIN code mismatch between correspondence and permanent addresses")
-                
-                # Check document number consistency (if same document type)
-                if (kyc_data.cor_poa_type and kyc_data.per_poa_type and
-                    kyc_data.cor_poa_type == kyc_data.per_poa_type and
-                    kyc_data.cor_poa_number and kyc_data.per_poa_number and
-                    kyc_data.cor_poa_number != kyc_data.per_poa_number):
-                    consistency_issues.append("Document number mismatch for same document type")
-                
-                confidence_score = max(0, 100 - (len(consistency_issues) * 25))
-                
-                return json.dumps({
-                    "success": True,
-                    "consistency_score": confidence_score,
-                    "issues": consistency_issues,
-                    "recommendation": "Approved" if confidence_score >= 75 else "Needs Review",
-                    "requestId": self.request_id
-                })
-                
             except Exception as e:
-                return json.dumps({
-                    "success": False,
-                    "error": str(e),
-                    "requestId": self.request_id
-                })
+                return json.dumps({"success": False, "error": str(e), "requestId": self.request_id})
+            return json.dumps(self._analyze_document_consistency(data))
         
         return [
             Tool(
@@ -241,9 +292,15 @@ class KYCClient:
         per_country: str = "India",
         per_pin: str = "",
         photo_image: Optional[str] = "",
+        fast_path: Optional[bool] = None,
+        time_budget: Optional[float] = None,
     ) -> Dict[str, Any]:
         """
         Process KYC document matching using LangChain agent with OpenAI.
+        With `fast_path` (default: KYC_RULES_FAST_PATH, on) the rule-based
+        validators run first and the agent is only used when they are not
+        conclusive. `time_budget` (seconds) stops the agent between steps
+        once it is spent, so a caller running this in a thread can bound it.
         """
         try:
             # Prepare data for analysis
@@ -283,6 +340,27 @@ class KYCClient:
             if photo_image:
                 image_analysis["photo"] = self._analyze_image_with_vision(photo_image, "Photo")
             
+            if fast_path is None:
+                fast_path = KYC_RULES_FAST_PATH
+            rule_analysis = self._run_rule_checks(kyc_data) if fast_path else None
+            if rule_analysis is not None:
+                logger.info(f"KYC rule checks conclusive ({rule_analysis['recommendation']}), skipping agent")
+                return {
+                    "success": True,
+                    "requestId": self.request_id,
+                    "personal_info": {
+                        "name": name,
+                        "dob": dob,
+                        "mobile": mobile,
+                        "email": email
+                    },
+                    "image_analysis": image_analysis,
+                    "agent_analysis": rule_analysis["summary"],
+                    "rule_analysis": rule_analysis,
+                    "processed_by": "Rule-Engine",
+                    "timestamp": json.dumps({"timestamp": "2025-01-01T00:00:00Z"})
+                }
+            
             # Create agent prompt
             agent_prompt = f"""
             You are a KYC (Know Your Customer) verification expert. 
@@ -313,7 +391,8 @@ class KYCClient:
             {json.dumps(kyc_data)}
             """
             
-            # Run the agent
+            # Run the agent; clients are reused, so the limit is set on every call
+            self.agent.max_execution_time = time_budget
             agent_response = self.agent.run(agent_prompt)
             
             # Combine results
@@ -2,14 +2,24 @@
 
 from openai import OpenAI
 import re
+import asyncio
 import json
+from .openai_pool import get_async_openai_client
+from .vision_cache import CachedVisionMixin
+from .image_preprocess import prepare_image_base64
 
-class LivenessService:
+class LivenessService(CachedVisionMixin):
     """
     Handles logic for analyzing an image via OpenAI's Vision model
     to detect whether it’s live or spoofed/tampered.
     """
 
+    model = "gpt-4o-mini"
+    # Selfies only need enough detail to spot screens, prints and masks
+    max_long_side = 1024
+    max_short_side = 768
+    jpeg_quality = 85
+
     def __init__(self, api_key: str):
         self.client = OpenAI(api_key=api_key)
 
@@ -21,6 +31,12 @@ class LivenessService:
             image_base64 = image_base64.split(",")[1]
         return re.sub(r"\s+", "", image_base64)
 
+    def _prepare_image(self, image_base64: str) -> str:
+        """
+        Downscales and recompresses the image to this service's size target before upload.
+        """
+        return prepare_image_base64(image_base64, self.max_long_side, self.max_short_side, self.jpeg_quality)
+
     def _extract_json(self, text: str) -> dict:
         """
         Attempts to safely extract JSON from GPT response text.
@@ -35,6 +51,39 @@ class LivenessService:
                 pass
         return None
 
+    def _build_messages(self, image_base64: str) -> list:
+        prompt = (
+            "You are a liveness detection model. "
+            "Given this selfie or face image, classify whether it shows a LIVE person "
+            "or a SPOOFED/TAMPERED image (like a printed photo, screen image, or mask). "
+            "Respond ONLY in valid JSON format like this:\n"
+            "{ \"is_live\": true|false, \"livenessScore\": 0.xx }"
+        )
+        return [
+            {"role": "system", "content": "You are a vision model for liveness detection."},
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}}
+                ]
+            }
+        ]
+
+    def _parse_response(self, content: str) -> dict:
+        # ✅ Try to parse JSON strictly
+        result = self._extract_json(content)
+
+        if result and "is_live" in result and "livenessScore" in result:
+            return {
+                "is_live": bool(result["is_live"]),
+                "livenessScore": float(result["livenessScore"])
+            }
+
+        # Fallback (if no valid JSON)
+        is_live, confidence = self._extract_liveness_flag(content)
+        return {"is_live": is_live, "livenessScore": confidence}
+
     def analyze_base64(self, image_base64: str) -> dict:
         """
         Uses OpenAI GPT-4 Vision to analyze a base64 image for liveness
@@ -42,45 +91,23 @@ class LivenessService:
         """
         try:
             image_base64 = self._clean_base64(image_base64)
-
-            prompt = (
-                "You are a liveness detection model. "
-                "Given this selfie or face image, classify whether it shows a LIVE person "
-                "or a SPOOFED/TAMPERED image (like a printed photo, screen image, or mask). "
-                "Respond ONLY in valid JSON format like this:\n"
-                "{ \"is_live\": true|false, \"livenessScore\": 0.xx }"
-            )
+            cache_key = self._cache_key(image_base64)
+            cached = self._get_cached_result(cache_key)
+            if cached is not None:
+                return cached
+            image_base64 = self._prepare_image(image_base64)
 
             response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are a vision model for liveness detection."},
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}}
-                        ]
-                    }
-                ],
+                model=self.model,
+                messages=self._build_messages(image_base64),
                 temperature=0.1,
                 max_tokens=100
             )
 
             content = response.choices[0].message.content.strip()
-
-            # ✅ Try to parse JSON strictly
-            result = self._extract_json(content)
-
-            if result and "is_live" in result and "livenessScore" in result:
-                return {
-                    "is_live": bool(result["is_live"]),
-                    "livenessScore": float(result["livenessScore"])
-                }
-
-            # Fallback (if no valid JSON)
-            is_live, confidence = self._extract_liveness_flag(content)
-            return {"is_live": is_live, "livenessScore": confidence}
+            result = self._parse_response(content)
+            self._store_result(cache_key, result)
+            return result
 
         except Exception as e:
             return {"status": "error", "message": str(e)}
@@ -95,3 +122,35 @@ class LivenessService:
         ):
             return True, 0.85
         return False, 0.60
+
+
+class AsyncLivenessService(LivenessService):
+    """
+    Event-loop friendly variant of LivenessService. All instances share the
+    process-wide pooled AsyncOpenAI client, so creating one per request is cheap.
+    """
+
+    def __init__(self, api_key: str):
+        self.client = get_async_openai_client(api_key)
+
+    async def analyze_base64(self, image_base64: str) -> dict:
+        try:
+            # Cleaning, hashing and resizing are CPU-bound - keep them off the event loop
+            cache_key, cached, image_base64 = await asyncio.to_thread(self._lookup_image, image_base64)
+            if cached is not None:
+                return cached
+
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(image_base64),
+                temperature=0.1,
+                max_tokens=100
+            )
+
+            content = response.choices[0].message.content.strip()
+            result = self._parse_response(content)
+            self._store_result(cache_key, result)
+            return result
+
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
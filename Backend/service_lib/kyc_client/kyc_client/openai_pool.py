@@ -0,0 +1,62 @@
+import os
+import logging
+import threading
+from typing import Dict
+
+import httpx
+from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["get_async_openai_client", "close_async_openai_clients"]
+
+# Connection pool tuning - vision calls are long-lived, so keep enough
+# keep-alive connections around for concurrent requests on one worker.
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+_clients: Dict[str, AsyncOpenAI] = {}
+_lock = threading.Lock()
+
+
+def _build_client(api_key: str) -> AsyncOpenAI:
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+    )
+    return AsyncOpenAI(
+        api_key=api_key,
+        http_client=http_client,
+        max_retries=OPENAI_MAX_RETRIES,
+    )
+
+
+def get_async_openai_client(api_key: str) -> AsyncOpenAI:
+    """Return the process-wide AsyncOpenAI client for this API key, creating it once."""
+    client = _clients.get(api_key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            logger.info("Creating shared AsyncOpenAI client")
+            client = _build_client(api_key)
+            _clients[api_key] = client
+        return client
+
+
+async def close_async_openai_clients() -> None:
+    """Close pooled connections; call on application shutdown."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        await client.close()
@@ -1,14 +1,25 @@
 from openai import OpenAI
 import re
+import asyncio
 import json
+from .openai_pool import get_async_openai_client
+from .vision_cache import CachedVisionMixin
+from .image_preprocess import prepare_image_base64
 
 
-class TamperDetectionService:
+class TamperDetectionService(CachedVisionMixin):
     """
     Handles logic for analyzing a document image via OpenAI's Vision model
     to detect whether it’s tampered, forged, or manipulated.
     """
 
+    model = "gpt-4o"
+    # Matches the high-detail tiling limits of gpt-4o, so no detail the
+    # model would see is lost
+    max_long_side = 2048
+    max_short_side = 768
+    jpeg_quality = 90
+
     def __init__(self, api_key: str):
         self.client = OpenAI(api_key=api_key)
 
@@ -20,6 +31,12 @@ class TamperDetectionService:
             image_base64 = image_base64.split(",")[1]
         return re.sub(r"\s+", "", image_base64)
 
+    def _prepare_image(self, image_base64: str) -> str:
+        """
+        Downscales and recompresses the image to this service's size target before upload.
+        """
+        return prepare_image_base64(image_base64, self.max_long_side, self.max_short_side, self.jpeg_quality)
+
     def _extract_json(self, text: str) -> dict:
         """
         Attempts to safely extract JSON from GPT response text.
@@ -33,16 +50,8 @@ class TamperDetectionService:
                 pass
         return None
 
-    def analyze_base64(self, image_base64: str) -> dict:
-        """
-        Detects document tampering (whole or partial) for Aadhaar, PAN, Voter ID,
-        Driving License. Identifies tampering in fields like photo, name, DOB, etc.
-        Returns structured JSON with tampering type, confidence, and reasons.
-        """
-        try:
-            image_base64 = self._clean_base64(image_base64)
-
-            prompt = """You are a forensic vision model that detects REAL document tampering. 
+    def _build_messages(self, image_base64: str) -> list:
+        prompt = """You are a forensic vision model that detects REAL document tampering. 
 You MUST NOT treat privacy-masking (blurred Aadhaar number, masked QR code, 
 blurred face, blurred address, redactions, white circles, black boxes) as tampering. 
 These are VALID user modifications and should be IGNORED.
@@ -77,37 +86,57 @@ Return ONLY valid JSON:
   "tampered_areas": ["photo", "name", "dob", "address", "id_number", "layout"],
   "reason": "short explanation"
 }"""
+        return [
+            {"role": "system",
+            "content": "You are an expert forensic document-tampering detection AI."},
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{image_base64}"
+                        }
+                    }
+                ]
+            },
+        ]
+
+    def _parse_response(self, content: str) -> dict:
+        result = self._extract_json(content)
+
+        if result:
+            return {
+                "is_tampered": bool(result.get("is_tampered", False)),
+                "confidence": float(result.get("confidence", 0))
+            }
+
+    def analyze_base64(self, image_base64: str) -> dict:
+        """
+        Detects document tampering (whole or partial) for Aadhaar, PAN, Voter ID,
+        Driving License. Identifies tampering in fields like photo, name, DOB, etc.
+        Returns structured JSON with tampering type, confidence, and reasons.
+        """
+        try:
+            image_base64 = self._clean_base64(image_base64)
+            cache_key = self._cache_key(image_base64)
+            cached = self._get_cached_result(cache_key)
+            if cached is not None:
+                return cached
+            image_base64 = self._prepare_image(image_base64)
 
             response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system",
-                    "content": "You are an expert forensic document-tampering detection AI."},
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_base64}"
-                                }
-                            }
-                        ]
-                    },
-                ],
+                model=self.model,
+                messages=self._build_messages(image_base64),
                 temperature=0.1,
                 max_tokens=300
             )
 
             content = response.choices[0].message.content.strip()
-            result = self._extract_json(content)
-
-            if result:
-                return {
-                    "is_tampered": bool(result.get("is_tampered", False)),
-                    "confidence": float(result.get("confidence", 0))
-                }
+            result = self._parse_response(content)
+            self._store_result(cache_key, result)
+            return result
 
         except Exception as e:
             return {"status": "error", "message": str(e)}
@@ -123,3 +152,35 @@ Return ONLY valid JSON:
         if any(word in text_lower for word in ["fake", "tampered", "forged", "edited", "altered", "manipulated"]):
             return True, 0.85
         return False, 0.90
+
+
+class AsyncTamperDetectionService(TamperDetectionService):
+    """
+    Event-loop friendly variant of TamperDetectionService. All instances share
+    the process-wide pooled AsyncOpenAI client, so creating one per request is cheap.
+    """
+
+    def __init__(self, api_key: str):
+        self.client = get_async_openai_client(api_key)
+
+    async def analyze_base64(self, image_base64: str) -> dict:
+        try:
+            # Cleaning, hashing and resizing are CPU-bound - keep them off the event loop
+            cache_key, cached, image_base64 = await asyncio.to_thread(self._lookup_image, image_base64)
+            if cached is not None:
+                return cached
+
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(image_base64),
+                temperature=0.1,
+                max_tokens=300
+            )
+
+            content = response.choices[0].message.content.strip()
+            result = self._parse_response(content)
+            self._store_result(cache_key, result)
+            return result
+
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
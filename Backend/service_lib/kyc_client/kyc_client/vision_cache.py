@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "MemoryTTLCache",
+    "DiskCache",
+    "VisionResultCache",
+    "CachedVisionMixin",
+    "get_vision_cache",
+]
+
+
+class MemoryTTLCache:
+    """Thread-safe LRU cache whose entries expire after a TTL."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 86400):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class DiskCache:
+    """
+    Optional second tier shared by all workers on a host and surviving
+    restarts. One small JSON file per key, fanned out by key prefix.
+    """
+
+    def __init__(self, directory: str, ttl: float = 86400):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "r") as fh:
+                return json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as fh:
+            json.dump(value, fh)
+        os.replace(tmp_path, path)
+
+
+class VisionResultCache:
+    """In-memory tier in front of an optional persistent tier."""
+
+    def __init__(self, memory: MemoryTTLCache, persistent=None):
+        self.memory = memory
+        self.persistent = persistent
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.memory.get(key)
+        if value is None and self.persistent is not None:
+            try:
+                value = self.persistent.get(key)
+            except Exception as e:
+                logger.warning(f"Vision cache read failed: {e}")
+                value = None
+            if value is not None:
+                self.memory.set(key, value)
+        return dict(value) if value is not None else None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self.memory.set(key, dict(value))
+        if self.persistent is not None:
+            try:
+                self.persistent.set(key, value)
+            except Exception as e:
+                logger.warning(f"Vision cache write failed: {e}")
+
+
+@lru_cache()
+def get_vision_cache() -> Optional[VisionResultCache]:
+    """Process-wide cache configured from the environment; VISION_CACHE_ENABLED=false disables it."""
+    if os.getenv("VISION_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    ttl = float(os.getenv("VISION_CACHE_TTL", "86400"))
+    memory = MemoryTTLCache(maxsize=int(os.getenv("VISION_CACHE_MAXSIZE", "1024")), ttl=ttl)
+    cache_dir = os.getenv("VISION_CACHE_DIR")
+    persistent = DiskCache(cache_dir, ttl=ttl) if cache_dir else None
+    return VisionResultCache(memory, persistent)
+
+
+class CachedVisionMixin:
+    """
+    Result caching for the vision services. The key covers the model, the
+    full prompt (so editing a prompt invalidates old results) and the
+    normalised base64 produced by _clean_base64, plus the preprocessing targets.
+    """
+
+    def _cache_key(self, image_base64: str) -> str:
+        sha256 = hashlib.sha256()
+        sha256.update(type(self).__name__.replace("Async", "").encode())
+        sha256.update(b"\0" + self.model.encode() + b"\0")
+        preprocessing = (getattr(self, "max_long_side", None), getattr(self, "max_short_side", None), getattr(self, "jpeg_quality", None))
+        sha256.update(repr(preprocessing).encode())
+        sha256.update(json.dumps(self._build_messages(""), sort_keys=True).encode())
+        sha256.update(b"\0" + image_base64.encode())
+        return sha256.hexdigest()
+
+    def _lookup_image(self, image_base64: str) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Clean, key and look up an image, preprocessing it on a miss. Returns
+        (cache key, cached result or None, prepared base64 or None). All of it
+        is CPU-bound on multi-MB strings, so async callers run it in a thread.
+        """
+        image_base64 = self._clean_base64(image_base64)
+        cache_key = self._cache_key(image_base64)
+        cached = self._get_cached_result(cache_key)
+        if cached is not None:
+            return cache_key, cached, None
+        return cache_key, None, self._prepare_image(image_base64)
+
+    def _get_cached_result(self, key: str) -> Optional[Dict[str, Any]]:
+        cache = get_vision_cache()
+        return cache.get(key) if cache is not None else None
+
+    def _store_result(self, key: str, result: Optional[Dict[str, Any]]) -> None:
+        cache = get_vision_cache()
+        # Errors and unparseable answers are never cached
+        if cache is not None and result and result.get("status") != "error":
+            cache.set(key, result)
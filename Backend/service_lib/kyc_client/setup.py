@@ -11,6 +11,7 @@ setup(
         'openai>=1.0.0',
         'pydantic>=2.0.0',
         'python-dotenv>=1.0.0',
-        'requests>=2.25.0'
+        'requests>=2.25.0',
+        'Pillow>=10.0.0'
     ]
 )
\ No newline at end of file
@@ -1,5 +1,6 @@
 # create_tables.py
 from .database import db,Base
-from .db_models import User, KYC, KYCStatusLog
+from .db_models import User, KYC, KYCStatusLog, BackgroundJob, KYCPdf
 Base.metadata.create_all(bind=db.engine)
-print("Tables created!")
\ No newline at end of file
+# Index changes on existing tables are applied by `python -m kyc_db.migrations`
+print("Tables created!")
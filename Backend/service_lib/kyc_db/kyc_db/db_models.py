@@ -162,8 +162,8 @@ class KYC(Base):
         # email search
         Index("idx_kyc_email", "kyc_email"),
 
-        # submitted_at sorting
-        Index("idx_kyc_submitted_at", "submitted_at"),
+        # submitted_at sorting + keyset pagination over (submitted_at, kyc_id)
+        Index("idx_kyc_submitted_at_kyc_id", "submitted_at", "kyc_id"),
 
         # For joining with status table
         Index("idx_kyc_user_id", "user_id"),
@@ -200,4 +200,59 @@ class KYC(Base):
     def add_ai_note(self, key: str, value: Any) -> None:
         if self.ai_notes is None:
             self.ai_notes = {}
-        self.ai_notes[key] = value
\ No newline at end of file
+        self.ai_notes[key] = value
+
+
+# --------------------------------------------------------------------------- #
+# Background Job Model (durable queue for post-submit AI work)
+# --------------------------------------------------------------------------- #
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class BackgroundJob(Base):
+    __tablename__ = "background_jobs"
+    __table_args__ = (
+        # Workers claim the oldest runnable job
+        Index("idx_background_jobs_claim", "status", "run_after"),
+    )
+
+    job_id = Column(Integer, primary_key=True, autoincrement=True)
+    job_type = Column(String(100), nullable=False)
+    payload = Column(JSONB, nullable=False, default=dict, server_default=text("'{}'"))
+    status = Column(String(20), nullable=False, default=JobStatus.QUEUED, server_default=text("'queued'"))
+    attempts = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    max_attempts = Column(Integer, nullable=False, default=5, server_default=text("5"))
+    last_error = Column(String, nullable=True)
+
+    run_after = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"))
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    locked_by = Column(String(100), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=text("NOW()"))
+    updated_at = Column(DateTime(timezone=True), server_default=text("NOW()"), onupdate=text("NOW()"))
+
+    def __repr__(self) -> str:
+        return f"<BackgroundJob {self.job_id} {self.job_type} → {self.status}>"
+
+
+# --------------------------------------------------------------------------- #
+# Rendered KYC PDF (one stored document per KYC, keyed by data version)
+# --------------------------------------------------------------------------- #
+class KYCPdf(Base):
+    __tablename__ = "kyc_pdfs"
+
+    kyc_id = Column(
+        Integer,
+        ForeignKey("kyc.kyc_id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    # md5 of KYC.data the PDF was rendered from
+    version = Column(String(32), nullable=False)
+    blob_digest = Column(String(64), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=text("NOW()"))
+
+    def __repr__(self) -> str:
+        return f"<KYCPdf {self.kyc_id} @ {self.version}>"
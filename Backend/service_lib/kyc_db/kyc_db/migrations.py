@@ -0,0 +1,54 @@
+# migrations.py
+"""
+One-off schema changes for databases created before the matching model
+change. create_all() only creates missing tables, never indexes on existing
+ones, so run this once per deployment (it is safe to re-run):
+
+    python -m kyc_db.migrations
+"""
+import logging
+from sqlalchemy import text
+from .database import db
+
+logger = logging.getLogger(__name__)
+
+# (description, statements). Indexes are built and dropped CONCURRENTLY so
+# writes to the table keep going while they run.
+MIGRATIONS = [
+    (
+        "Keyset pagination index on kyc (submitted_at, kyc_id)",
+        [
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_kyc_submitted_at_kyc_id ON kyc (submitted_at, kyc_id)",
+            # Superseded by the composite index above
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_kyc_submitted_at",
+        ],
+    ),
+]
+
+# Indexes created above; see run_migrations for why their names are needed
+BUILT_INDEXES = ["idx_kyc_submitted_at_kyc_id"]
+
+_INVALID_INDEXES = text(
+    "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+    "WHERE NOT i.indisvalid AND c.relname = ANY(:names)"
+)
+
+
+def run_migrations() -> None:
+    # CONCURRENTLY cannot run inside a transaction block
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # An interrupted concurrent build leaves an invalid index behind that
+        # IF NOT EXISTS would otherwise skip
+        for name in conn.execute(_INVALID_INDEXES, {"names": BUILT_INDEXES}).scalars():
+            logger.warning(f"Dropping invalid index {name} left by an interrupted build")
+            conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+        for description, statements in MIGRATIONS:
+            logger.info(f"Applying: {description}")
+            for statement in statements:
+                conn.execute(text(statement))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_migrations()
+    print("Migrations applied!")
@@ -1,2 +1,4 @@
 from .email_client import EmailClient
 from .email_manager import EmailManager
+from .mail_dispatcher import MailMessage, MailDispatcher, MailQueueFullError, get_mail_dispatcher
+from .template_engine import CompiledTemplate, TemplateCache, get_template_cache
@@ -4,6 +4,16 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.utils import formataddr
 
+def build_message(sender_email: str, recipient_email: str, subject: str, body: str) -> MIMEMultipart:
+    """Build the HTML message sent by both the direct client and the mail dispatcher."""
+    msg = MIMEMultipart()
+    msg["From"] = formataddr(("Kyra", sender_email))
+    msg["To"] = recipient_email
+    msg["Subject"] = subject
+
+    msg.attach(MIMEText(body, "html"))
+    return msg
+
 class EmailClient:
     def __init__(self, smtp_server=None, smtp_port=None, sender_email=None, sender_password=None):
         self.smtp_server = smtp_server
@@ -14,12 +24,7 @@ class EmailClient:
     def send_email(self, recipient_email: str, subject: str, body: str):
         """Sends an HTML email."""
         try:
-            msg = MIMEMultipart()
-            msg["From"] = formataddr(("Kyra", self.sender_email))
-            msg["To"] = recipient_email
-            msg["Subject"] = subject
-
-            msg.attach(MIMEText(body, "html"))
+            msg = build_message(self.sender_email, recipient_email, subject, body)
 
             with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
                 server.starttls()
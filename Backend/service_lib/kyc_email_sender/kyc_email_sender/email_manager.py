@@ -1,30 +1,42 @@
-import os
+import logging
+from typing import List
 from .email_client import EmailClient
+from .template_engine import get_template_cache
+from .mail_dispatcher import MailMessage
+
+logger = logging.getLogger(__name__)
 
 
 class EmailManager:
-    def __init__(self, smtp_server=None, smtp_port=None, sender_email=None, sender_password=None):
+    def __init__(self, smtp_server=None, smtp_port=None, sender_email=None, sender_password=None, dispatcher=None):
+        """
+        With a running `dispatcher` (see get_mail_dispatcher) emails are queued
+        and sent over pooled SMTP connections; otherwise each send opens its own
+        connection through EmailClient.
+        """
         self.client = EmailClient(smtp_server, smtp_port, sender_email, sender_password)
+        self.dispatcher = dispatcher
 
     def _load_email_template(self, template_name: str, replacements: dict) -> str:
-        """Load the email template from the file and replace placeholders."""
-        template_path = os.path.join(os.path.dirname(__file__), 'email_templates', f'{template_name}.html')
-        
+        """Render a cached, precompiled email template with the given placeholder values."""
         try:
-            with open(template_path, 'r') as file:
-                template = file.read()
-
-            # Replace placeholders with dynamic data
-            for placeholder, value in replacements.items():
-                template = template.replace(f'{{{{ {placeholder} }}}}', value)
+            return get_template_cache().render(template_name, replacements)
+        except Exception as e:
+            raise Exception(f"Failed to load template {template_name}: {e}")
 
-            return template
+    def render_bulk(self, template_name: str, replacements_list: List[dict]) -> List[str]:
+        """Render one template for many recipients in a single call."""
+        try:
+            return get_template_cache().render_many(template_name, replacements_list)
         except Exception as e:
             raise Exception(f"Failed to load template {template_name}: {e}")
 
     def send_email_with_template(self, recipient_email: str, subject: str, body: str):
         """Send email using a loaded template."""
         try:
+            if self.dispatcher is not None and self.dispatcher.running:
+                self.dispatcher.submit(MailMessage(recipient_email, subject, body))
+                return
             self.client.send_email(recipient_email, subject, body)
         except Exception as e:
             raise Exception(f"Failed to send email: {e}")
@@ -60,6 +72,43 @@ class EmailManager:
         body = self._load_email_template('rekyc_email', replacements)
         self.send_email_with_template(recipient_email, subject, body)
 
+    def _send_bulk_link_emails(self, template_name: str, subject: str, recipients: List[dict], base_url: str) -> int:
+        """
+        `recipients` are dicts with recipient_email, user_name and kyc_id. All
+        bodies are rendered from one compiled template, then sent (or queued
+        on the dispatcher). A recipient that fails (SMTP error, full mail
+        queue) is logged and skipped. Returns the number of emails sent or queued.
+        """
+        replacements_list = [
+            {
+                'user_name': str(recipient.get('user_name') or "User"),
+                'kyc_id': str(recipient['kyc_id']),
+                'link': f"{base_url}/{recipient['kyc_id']}"
+            }
+            for recipient in recipients
+        ]
+        bodies = self.render_bulk(template_name, replacements_list)
+        sent = 0
+        failed = []
+        for recipient, body in zip(recipients, bodies):
+            try:
+                self.send_email_with_template(recipient['recipient_email'], subject, body)
+                sent += 1
+            except Exception as e:
+                failed.append(recipient['recipient_email'])
+                logger.warning(f"{template_name} not sent to {recipient['recipient_email']} (KYC ID {recipient['kyc_id']}): {e}")
+        if failed:
+            logger.error(f"{template_name}: {len(failed)} of {len(bodies)} emails not sent: {', '.join(failed)}")
+        return sent
+
+    def send_bulk_welcome_emails(self, recipients: List[dict], base_url: str) -> int:
+        """Welcome emails for a bulk initiation."""
+        return self._send_bulk_link_emails('welcome_email', "Welcome to Kyra Agentic KYC Journey", recipients, base_url)
+
+    def send_bulk_rekyc_emails(self, recipients: List[dict], base_url: str) -> int:
+        """Re-KYC campaign."""
+        return self._send_bulk_link_emails('rekyc_email', "Re-KYC Request from Kyra", recipients, base_url)
+
     def send_congrats_email(self, recipient_email: str, user_name: str, kyc_id: str):
         """Send Welcome email with dynamic KYC link."""
         subject = "Congrats! KYC is Sucessful"
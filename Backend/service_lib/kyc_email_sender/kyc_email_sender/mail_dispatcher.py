@@ -0,0 +1,201 @@
+import os
+import asyncio
+import logging
+import concurrent.futures
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional
+
+import aiosmtplib
+
+from .email_client import build_message
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["MailMessage", "MailDispatcher", "MailQueueFullError", "get_mail_dispatcher"]
+
+MAIL_POOL_SIZE = int(os.getenv("MAIL_POOL_SIZE", "4"))
+MAIL_QUEUE_SIZE = int(os.getenv("MAIL_QUEUE_SIZE", "10000"))
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "50"))
+MAIL_ENQUEUE_TIMEOUT = float(os.getenv("MAIL_ENQUEUE_TIMEOUT", "30"))
+MAIL_DRAIN_TIMEOUT = float(os.getenv("MAIL_DRAIN_TIMEOUT", "30"))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+
+class MailQueueFullError(RuntimeError):
+    """The message was not queued: the queue stayed full past the enqueue timeout."""
+
+
+@dataclass
+class MailMessage:
+    recipient_email: str
+    subject: str
+    body: str
+
+
+class MailDispatcher:
+    """
+    Async outbound mail queue. `pool_size` workers each keep one SMTP
+    connection open (STARTTLS and login happen once per connection, not per
+    mail) and drain the queue in batches of up to `batch_size` messages.
+    The queue is bounded, so producers in worker threads wait when it is full.
+    """
+
+    def __init__(self, smtp_server=None, smtp_port=None, sender_email=None, sender_password=None,
+                 pool_size: int = MAIL_POOL_SIZE, queue_size: int = MAIL_QUEUE_SIZE,
+                 batch_size: int = MAIL_BATCH_SIZE, use_starttls: bool = True):
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.sender_email = sender_email
+        self.sender_password = sender_password
+        self.pool_size = max(1, pool_size)
+        self.queue_size = queue_size
+        self.batch_size = max(1, batch_size)
+        self.use_starttls = use_starttls
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.pool_size)]
+        logger.info(f"Mail dispatcher started with {self.pool_size} SMTP connections")
+
+    async def stop(self) -> None:
+        """Flush queued mail (up to MAIL_DRAIN_TIMEOUT) and close the connections."""
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=MAIL_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Mail dispatcher stopped with {self._queue.qsize()} unsent messages")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def enqueue(self, message: MailMessage, timeout: float = MAIL_ENQUEUE_TIMEOUT) -> None:
+        """
+        Queue a message from async code, waiting up to `timeout` while the
+        queue is full. Raises MailQueueFullError if it was not queued.
+        """
+        try:
+            await asyncio.wait_for(self._queue.put(message), timeout=timeout)
+        except asyncio.TimeoutError:
+            # wait_for cancelled the put, so the message is definitely not queued
+            logger.error(f"Mail queue full, dropped email to {message.recipient_email}")
+            raise MailQueueFullError(f"Mail queue full, dropped email to {message.recipient_email}")
+
+    def submit(self, message: MailMessage) -> None:
+        """
+        Queue a message from any thread. Worker threads block (up to
+        MAIL_ENQUEUE_TIMEOUT) while the queue is full; the event loop thread
+        itself cannot wait, so there a full queue fails at once. Raises
+        MailQueueFullError whenever the message was not queued.
+        """
+        if not self.running:
+            raise RuntimeError("Mail dispatcher is not running")
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            try:
+                self._queue.put_nowait(message)
+            except asyncio.QueueFull:
+                logger.error(f"Mail queue full, dropped email to {message.recipient_email}")
+                raise MailQueueFullError(f"Mail queue full, dropped email to {message.recipient_email}")
+            return
+        # The enqueue timeout runs on the loop, which decides atomically whether
+        # the message was queued; the extra margin only covers a stalled loop
+        future = asyncio.run_coroutine_threadsafe(self.enqueue(message, MAIL_ENQUEUE_TIMEOUT), self._loop)
+        try:
+            future.result(timeout=MAIL_ENQUEUE_TIMEOUT + 5)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise MailQueueFullError(f"Mail queue did not respond, dropped email to {message.recipient_email}")
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.smtp_server,
+            port=self.smtp_port,
+            start_tls=self.use_starttls,
+            timeout=SMTP_TIMEOUT,
+        )
+        await smtp.connect()
+        if self.sender_password:
+            await smtp.login(self.sender_email, self.sender_password)
+        return smtp
+
+    async def _next_batch(self) -> List[MailMessage]:
+        batch = [await self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _worker(self, slot: int) -> None:
+        smtp: Optional[aiosmtplib.SMTP] = None
+        try:
+            while True:
+                batch = await self._next_batch()
+                try:
+                    for message in batch:
+                        smtp = await self._send(smtp, message)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            if smtp is not None and smtp.is_connected:
+                try:
+                    await smtp.quit()
+                except Exception:
+                    smtp.close()
+
+    async def _send(self, smtp: Optional[aiosmtplib.SMTP], message: MailMessage) -> Optional[aiosmtplib.SMTP]:
+        """Send over the worker's connection, reconnecting once if it was dropped. Returns the connection."""
+        msg = build_message(self.sender_email, message.recipient_email, message.subject, message.body)
+        for attempt in range(2):
+            try:
+                if smtp is None or not smtp.is_connected:
+                    smtp = await self._connect()
+                await smtp.send_message(msg)
+                return smtp
+            except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, ConnectionError, asyncio.TimeoutError) as e:
+                if smtp is not None:
+                    smtp.close()
+                smtp = None
+                if attempt == 1:
+                    logger.error(f"Failed to send email to {message.recipient_email}: {e}")
+            except Exception as e:
+                logger.error(f"Failed to send email to {message.recipient_email}: {e}")
+                return smtp
+        return smtp
+
+
+@lru_cache()
+def get_mail_dispatcher() -> MailDispatcher:
+    """
+    Process-wide dispatcher configured from the SMTP_* environment variables.
+    For local testing, run aiosmtpd as a stand-in server
+    (`python -m aiosmtpd -n -l localhost:1025`) with SMTP_SERVER=localhost,
+    SMTP_PORT=1025, SMTP_STARTTLS=false and SMTP_SENDER_PASSWORD unset.
+    """
+    return MailDispatcher(
+        smtp_server=os.getenv("SMTP_SERVER"),
+        smtp_port=int(os.getenv("SMTP_PORT", "587")),
+        sender_email=os.getenv("SMTP_SENDER_EMAIL"),
+        sender_password=os.getenv("SMTP_SENDER_PASSWORD"),
+        use_starttls=os.getenv("SMTP_STARTTLS", "true").lower() == "true",
+    )
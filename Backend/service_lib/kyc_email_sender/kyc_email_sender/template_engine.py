@@ -0,0 +1,81 @@
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+__all__ = ["CompiledTemplate", "TemplateCache", "get_template_cache"]
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), 'email_templates')
+
+# Same placeholder syntax the templates have always used: {{ name }}
+_PLACEHOLDER = re.compile(r"\{\{ (\w+) \}\}")
+
+
+class CompiledTemplate:
+    """
+    A template split once into literal chunks and placeholder slots, so a
+    render is a single join instead of one str.replace pass per placeholder.
+    Placeholders without a value are left in the output unchanged.
+    """
+
+    def __init__(self, source: str):
+        self._chunks: List[str] = []
+        self._slots: List[Tuple[int, str, str]] = []
+        position = 0
+        for match in _PLACEHOLDER.finditer(source):
+            self._chunks.append(source[position:match.start()])
+            self._slots.append((len(self._chunks), match.group(1), match.group(0)))
+            self._chunks.append(match.group(0))
+            position = match.end()
+        self._chunks.append(source[position:])
+
+    @property
+    def placeholders(self) -> List[str]:
+        return [name for _, name, _ in self._slots]
+
+    def render(self, replacements: Dict[str, str]) -> str:
+        chunks = self._chunks[:]
+        for index, name, original in self._slots:
+            value = replacements.get(name)
+            chunks[index] = original if value is None else value
+        return "".join(chunks)
+
+    def render_many(self, rows: Iterable[Dict[str, str]]) -> List[str]:
+        return [self.render(row) for row in rows]
+
+
+class TemplateCache:
+    """Compiles each template on first use and again only when its file's mtime changes."""
+
+    def __init__(self, directory: str = TEMPLATE_DIR):
+        self.directory = directory
+        self._templates: Dict[str, Tuple[int, CompiledTemplate]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, template_name: str) -> CompiledTemplate:
+        path = os.path.join(self.directory, f'{template_name}.html')
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._templates.get(template_name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with self._lock:
+            cached = self._templates.get(template_name)
+            if cached is None or cached[0] != mtime:
+                with open(path, 'r') as file:
+                    cached = (mtime, CompiledTemplate(file.read()))
+                self._templates[template_name] = cached
+            return cached[1]
+
+    def render(self, template_name: str, replacements: Dict[str, str]) -> str:
+        return self.get(template_name).render(replacements)
+
+    def render_many(self, template_name: str, rows: Iterable[Dict[str, str]]) -> List[str]:
+        """Render one template for many recipients, compiling (and stat-ing) it only once."""
+        return self.get(template_name).render_many(rows)
+
+
+_template_cache = TemplateCache()
+
+
+def get_template_cache() -> TemplateCache:
+    return _template_cache
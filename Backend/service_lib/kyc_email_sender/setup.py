@@ -4,5 +4,8 @@ setup(
     name='kyc_email_sender',
     version='1.0',
     description='Utilities',
-    packages=find_packages()
+    packages=find_packages(),
+    install_requires=[
+        'aiosmtplib>=2.0.0'
+    ]
 )
\ No newline at end of file
@@ -0,0 +1,3 @@
+from .blob_store import *
+from .image_refs import *
+from .thumbnails import *
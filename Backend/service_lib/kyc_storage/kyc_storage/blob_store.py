@@ -0,0 +1,165 @@
+import os
+import hashlib
+import logging
+import tempfile
+from functools import lru_cache
+from typing import BinaryIO, Dict, Iterable, Iterator, Type
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "BlobStore",
+    "LocalBlobStore",
+    "BlobNotFoundError",
+    "register_blob_backend",
+    "get_blob_store",
+    "DEFAULT_CHUNK_SIZE",
+]
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class BlobNotFoundError(KeyError):
+    """Raised when a digest is not present in the blob store."""
+
+
+class BlobStore:
+    """
+    Content-addressed storage keyed by the SHA-256 hex digest of the bytes.
+    Backends only need to implement the raw primitives; hashing and
+    de-duplication live here so every backend behaves the same.
+    """
+
+    def put(self, data: bytes) -> str:
+        """Store bytes and return their SHA-256 hex digest."""
+        return self.put_stream([data])
+
+    def put_stream(self, chunks: Iterable[bytes]) -> str:
+        """Store an iterable of byte chunks and return their SHA-256 hex digest."""
+        raise NotImplementedError
+
+    def exists(self, digest: str) -> bool:
+        raise NotImplementedError
+
+    def open(self, digest: str) -> BinaryIO:
+        """Return a binary file-like object for the blob."""
+        raise NotImplementedError
+
+    def size(self, digest: str) -> int:
+        raise NotImplementedError
+
+    def delete(self, digest: str) -> None:
+        raise NotImplementedError
+
+    def read(self, digest: str) -> bytes:
+        with self.open(digest) as fh:
+            return fh.read()
+
+    def iter_chunks(self, digest: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield the blob in fixed-size chunks (for streaming responses)."""
+        with self.open(digest) as fh:
+            while True:
+                chunk = fh.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    @staticmethod
+    def _validate_digest(digest: str) -> str:
+        digest = (digest or "").lower()
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+            raise ValueError(f"Invalid SHA-256 digest: {digest!r}")
+        return digest
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Filesystem backend. Blobs are fanned out as <root>/ab/cd/<digest> so no
+    single directory grows unbounded. Writes go to a temp file in the same
+    directory tree and are renamed into place, so readers never see partial
+    blobs and concurrent writers of the same content are harmless.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        digest = self._validate_digest(digest)
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def put_stream(self, chunks: Iterable[bytes]) -> str:
+        sha256 = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(prefix=".upload-", dir=self.root)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    sha256.update(chunk)
+                    tmp.write(chunk)
+
+            digest = sha256.hexdigest()
+            path = self._path(digest)
+            if os.path.exists(path):
+                # Same content already stored - nothing to do
+                os.remove(tmp_path)
+                return digest
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+            return digest
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self._path(digest))
+
+    def open(self, digest: str) -> BinaryIO:
+        try:
+            return open(self._path(digest), "rb")
+        except FileNotFoundError:
+            raise BlobNotFoundError(digest)
+
+    def size(self, digest: str) -> int:
+        try:
+            return os.path.getsize(self._path(digest))
+        except FileNotFoundError:
+            raise BlobNotFoundError(digest)
+
+    def delete(self, digest: str) -> None:
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+
+# --------------------------------------------------------------------------- #
+# Backend registry
+# --------------------------------------------------------------------------- #
+_BACKENDS: Dict[str, Type[BlobStore]] = {
+    "local": LocalBlobStore,
+}
+
+
+def register_blob_backend(name: str, backend_cls: Type[BlobStore]) -> None:
+    """Register an additional backend (e.g. S3) selectable via BLOB_STORAGE_BACKEND."""
+    _BACKENDS[name] = backend_cls
+    get_blob_store.cache_clear()
+
+
+@lru_cache()
+def get_blob_store() -> BlobStore:
+    """Return the process-wide blob store configured from environment variables."""
+    backend = os.getenv("BLOB_STORAGE_BACKEND", "local").lower()
+    if backend not in _BACKENDS:
+        raise ValueError(f"Unknown blob storage backend: {backend}")
+
+    if backend == "local":
+        root = os.getenv("BLOB_STORAGE_PATH", "/data/blobs")
+        logger.info(f"Using local blob store at {root}")
+        return LocalBlobStore(root)
+
+    return _BACKENDS[backend]()
@@ -0,0 +1,94 @@
+import re
+import base64
+import binascii
+from typing import Optional
+
+from .blob_store import BlobStore, get_blob_store
+
+__all__ = [
+    "BLOB_REF_PREFIX",
+    "is_blob_ref",
+    "make_blob_ref",
+    "parse_blob_ref",
+    "guess_content_type",
+    "decode_base64_image",
+    "store_base64_image",
+    "load_base64_image",
+]
+
+# References stored in KYC.data instead of the base64 payload, e.g.
+# "blob:sha256:9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08"
+BLOB_REF_PREFIX = "blob:sha256:"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_MAGIC_CONTENT_TYPES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"%PDF", "application/pdf"),
+)
+
+
+def is_blob_ref(value) -> bool:
+    return isinstance(value, str) and value.startswith(BLOB_REF_PREFIX)
+
+
+def make_blob_ref(digest: str) -> str:
+    return f"{BLOB_REF_PREFIX}{digest}"
+
+
+def parse_blob_ref(ref: str) -> str:
+    """Return the SHA-256 digest encoded in a blob reference."""
+    if not is_blob_ref(ref):
+        raise ValueError(f"Not a blob reference: {ref!r}")
+    return ref[len(BLOB_REF_PREFIX):]
+
+
+def guess_content_type(head: bytes) -> str:
+    """Sniff the MIME type from the first bytes of a blob."""
+    for magic, content_type in _MAGIC_CONTENT_TYPES:
+        if head.startswith(magic):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def decode_base64_image(value: str) -> bytes:
+    """Decode a data URI or bare base64 string to raw bytes."""
+    if value.startswith("data:") and "," in value:
+        value = value.split(",", 1)[1]
+    try:
+        return base64.b64decode(_WHITESPACE_RE.sub("", value), validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Invalid base64 image data: {e}")
+
+
+def store_base64_image(value: Optional[str], store: Optional[BlobStore] = None) -> Optional[str]:
+    """
+    Decode a (data URI or bare) base64 image, persist it in the blob store and
+    return its reference. Empty values and existing references pass through.
+    """
+    if not value or is_blob_ref(value):
+        return value
+
+    store = store or get_blob_store()
+    return make_blob_ref(store.put(decode_base64_image(value)))
+
+
+def load_base64_image(value: Optional[str], store: Optional[BlobStore] = None, as_data_uri: bool = True) -> Optional[str]:
+    """
+    Inverse of store_base64_image: resolve a blob reference back to base64.
+    Legacy rows that still hold inline base64 are returned unchanged.
+    """
+    if not is_blob_ref(value):
+        return value
+
+    store = store or get_blob_store()
+    raw = store.read(parse_blob_ref(value))
+    encoded = base64.b64encode(raw).decode("ascii")
+    if not as_data_uri:
+        return encoded
+    return f"data:{guess_content_type(raw[:16])};base64,{encoded}"
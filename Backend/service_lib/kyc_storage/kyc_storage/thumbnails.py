@@ -0,0 +1,39 @@
+import io
+import os
+import logging
+from typing import Optional
+
+try:
+    from PIL import Image, ImageOps
+except ImportError as e:
+    logging.warning(f"Pillow not installed, thumbnails are disabled: {e}")
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["THUMBNAIL_SIZE", "make_thumbnail"]
+
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "96"))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+
+
+def make_thumbnail(raw: bytes, size: int = THUMBNAIL_SIZE) -> Optional[bytes]:
+    """
+    Build a square, centre-cropped JPEG thumbnail from raw image bytes.
+    Returns None when Pillow is unavailable or the bytes are not an image.
+    """
+    if Image is None or not raw:
+        return None
+    try:
+        with Image.open(io.BytesIO(raw)) as img:
+            # draft() lets the JPEG decoder downscale while decoding
+            img.draft("RGB", (size * 2, size * 2))
+            img = ImageOps.exif_transpose(img).convert("RGB")
+            thumb = ImageOps.fit(img, (size, size), method=Image.LANCZOS)
+
+        out = io.BytesIO()
+        thumb.save(out, format="JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+        return out.getvalue()
+    except Exception as e:
+        logger.warning(f"Thumbnail generation failed: {e}")
+        return None
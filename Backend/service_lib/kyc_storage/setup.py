@@ -0,0 +1,8 @@
+from setuptools import setup, find_packages
+
+setup(
+    name='kyc_storage',
+    version='1.0',
+    description='Content-addressed blob storage for KYC images',
+    packages=find_packages()
+)
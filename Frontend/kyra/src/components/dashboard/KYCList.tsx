@@ -87,7 +87,7 @@ export const getStatusColor = (status: string) => {
 
 interface KYCRecord {
   kyc_id: string;
-  photoImage: string;
+  photoThumbnailUrl: string | null;
   user_name: string;
   email: string;
   status: string;
@@ -265,9 +265,10 @@ export const KYCList = () => {
           <TableCell className="py-4">
             <div className="flex items-center gap-3">
               <div className="w-10 h-10 rounded-xl overflow-hidden flex items-center justify-center shadow-sm">
-                {record.photoImage ? (
+                {record.photoThumbnailUrl ? (
                   <img
-                    src={`${record.photoImage}`}
+                    src={new URL(record.photoThumbnailUrl, import.meta.env.VITE_API_BASE_URL).toString()}
+                    loading="lazy"
                     alt={record.user_name}
                     className="w-full h-full object-cover"
                   />